@@ -0,0 +1,122 @@
+import os
+import argparse
+from pathlib import Path
+import numpy as np
+
+from goosekit.binio import read_bin_xyz
+from goosekit.cli import add_nn_args
+from goosekit.labels import label_rel_path
+from goosekit.neighbors import ScanMatcher
+from goosekit.report import finish_reports, threshold_check
+from goosekit.shards import ShardPacker, open_store
+from goosekit.shm_cache import attach_store
+from goosekit.tasks import group_by_scan, run_scan_tasks, scan_originals, voxel_sizes_for_roots
+
+"""
+Back-projection of per-point predictions from decompressed clouds onto the
+original scans (the reverse of create_labels_4_decompressed_lidar.py):
+- Reads decompressed BINs (xyz) and the predicted LABEL files made on them
+- Reads the original BIN once per scan
+- Builds a neighbour index over the decompressed xyz and queries every original
+  point against it in one batched call (reverse NN)
+- Writes a .label per original scan holding the prediction of the nearest
+  decompressed point, aligned point-for-point with the original .bin, so the
+  segmentation metric can be computed on the uncompressed ground truth
+- Per-file distance statistics (original -> decompressed) go to a sidecar report
+
+Predictions are expected under --pred_root with the ground-truth label naming
+(`_vls128` / `_pcl` -> `_goose`, `.label`) and the same directory structure as
+--decomp_bin_root. The uint32 values are copied through unchanged.
+
+Usage:
+python backproject_predictions_4_original_lidar.py \
+  --decomp_bin_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_8 /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_512 \
+  --pred_root /scratch/aniemcz/predictions/ptv3/Q_8 /scratch/aniemcz/predictions/ptv3/Q_512 \
+  --orig_bin_root /scratch/aniemcz/goose-pointcept/lidar \
+  --out_label_root /scratch/aniemcz/predictions_on_original/ptv3/Q_8 /scratch/aniemcz/predictions_on_original/ptv3/Q_512 \
+  --nn_backend voxel \
+  --query_threads 4 \
+  --num_workers 4
+"""
+
+def backproject_labels_nn(args):
+    """
+    Worker: map the predictions of every decompressed version (Q level) of one
+    original scan back onto the original points. The original is read once.
+    """
+    rel, levels, orig_bin_root, nn_backend, query_threads, match_mode, shared = args
+    todo = [lvl for lvl in levels if not lvl[2].exists()]
+    if not todo:
+        return [lvl[2] for lvl in levels], []
+
+    xyz_orig = (attach_store(shared) if shared else open_store(orig_bin_root)).read_bin_xyz(rel)
+
+    rows = []
+    for decomp_bin_path, pred_path, out_label, voxel_size in todo:
+        out_label.parent.mkdir(parents=True, exist_ok=True)
+
+        xyz_dec = read_bin_xyz(decomp_bin_path)
+        pred = np.fromfile(str(pred_path), dtype=np.uint32)
+        if pred.shape[0] != xyz_dec.shape[0]:
+            raise ValueError(f"Prediction count mismatch: {pred_path} has {pred.shape[0]}, "
+                             f"{decomp_bin_path} has {xyz_dec.shape[0]} points")
+
+        # Index over the decompressed points, all original points queried at once
+        matcher = ScanMatcher(xyz_dec, backend=nn_backend, workers=query_threads)
+        dists, idxs = matcher.match(xyz_orig, match_mode=match_mode, voxel_size=voxel_size)
+
+        row, _ = threshold_check(pred_path, out_label, dists, None)
+        rows.append(row)
+        pred[idxs].tofile(str(out_label))
+    return [lvl[2] for lvl in levels], rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Back-project predicted labels from decompressed clouds onto the original scans (parallel)'
+    )
+    parser.add_argument('--decomp_bin_root', '-p', type=str, nargs='+', required=True,
+                        help='Root of the decompressed BINs the predictions were made on (one per Q level)')
+    parser.add_argument('--pred_root', '-l', type=str, nargs='+', required=True,
+                        help='Root of the predicted LABELs (one per --decomp_bin_root)')
+    parser.add_argument('--orig_bin_root', '-b', type=str, required=True,
+                        help='Root of original BINs (a directory tree or packed .shard files)')
+    parser.add_argument('--out_label_root', '-o', type=str, nargs='+', required=True,
+                        help='Output root for LABELs aligned to the original scans (one per --decomp_bin_root)')
+    parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
+                        help='Parallel worker count')
+    add_nn_args(parser, index_cache=False, shm_cache='original scans')
+    args = parser.parse_args()
+
+    n_roots = len(args.decomp_bin_root)
+    if len(args.pred_root) != n_roots or len(args.out_label_root) != n_roots:
+        parser.error("--pred_root and --out_label_root need one root per --decomp_bin_root")
+    decomp_bin_roots = [Path(p) for p in args.decomp_bin_root]
+    pred_roots = [Path(p) for p in args.pred_root]
+    orig_bin_root = Path(args.orig_bin_root)
+    out_label_roots = [Path(p) for p in args.out_label_root]
+    voxel_sizes = voxel_sizes_for_roots(args.voxel_size, decomp_bin_roots)
+
+    groups = group_by_scan(decomp_bin_roots, '*.bin')
+    n_files = sum(len(g) for g in groups.values())
+    print(f"Found {n_files} decomp bin files for {len(groups)} original scans under {n_roots} root(s)")
+    packer = ShardPacker(out_label_roots) if args.shard_outputs else None
+    tasks, originals = [], []
+    for rel, members in groups.items():
+        levels = [(p, pred_roots[i] / label_rel_path(rel), out_label_roots[i] / label_rel_path(rel), voxel_sizes[i])
+                  for i, p in members]
+        if packer:
+            # levels packed by an earlier run are done
+            levels = packer.add(rel, levels, lambda lvl: [lvl[2]])
+            if not levels:
+                continue
+        tasks.append((rel, levels, orig_bin_root, args.nn_backend, args.query_threads, args.match_mode))
+        originals.append(scan_originals(rel, [lvl[2] for lvl in levels], orig_bin_root))
+
+    rows = run_scan_tasks(backproject_labels_nn, tasks, originals, args.num_workers,
+                          "Back-projecting predictions NN", "Back-projected", args.shm_cache_gb, packer=packer)
+    finish_reports(rows, args.report, out_label_roots)
+    print("Prediction back-projection (NN) complete.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+from pathlib import Path
+
+from goosekit.benchmark import run_benchmark
+from goosekit.codecs import CODECS, LcpCodec, QuantizeCodec, RenoCodec, Tmc13Codec
+
+'''
+Benchmark any codec of goosekit.codecs with the shared scheduler
+(goosekit.benchmark): same run layout, resume and result schema for all of them.
+
+  reno       RENO/compressNew.py + RENO/decompressToBin.py (--ckpt), levels = posQ
+  tmc13      MPEG G-PCC tmc3 (--tmc3, --tmc13_cfg), levels = positionQuantizationScale
+  lcp        LCP on *_x.dat / _y / _z (--lcp, --ply_root), levels = error bounds
+  quantize   raw grid quantization baseline, levels = grid step in mm
+
+Usage:
+python benchmark_codecs.py --codec quantize \
+  --data_root /scratch/aniemcz/goose-pointcept/lidar \
+  --levels 8 64 512 \
+  --output_root /scratch/aniemcz/goose-pointcept/quantize_compression_results
+
+python benchmark_codecs.py --codec reno --in_process \
+  --data_root /scratch/aniemcz/goose-pointcept/ply_xyz_only_lidar \
+  --ckpt ./RENO/model/Goose/ckpt.pt \
+  --levels 8 64 512 \
+  --output_root /scratch/aniemcz/goose-pointcept/reno_decompressed_lidar
+'''
+
+
+def make_codec(args):
+    if args.codec == 'reno':
+        if not args.ckpt:
+            raise SystemExit("--codec reno needs --ckpt")
+        return RenoCodec(args.reno_dir, args.ckpt, args.input_file_type or 'ply', args.in_process)
+    if args.codec == 'tmc13':
+        return Tmc13Codec(args.tmc3, args.tmc13_cfg, args.input_file_type or 'ply')
+    if args.codec == 'lcp':
+        return LcpCodec(args.lcp, args.data_root, args.ply_root)
+    return QuantizeCodec(args.input_file_type or 'bin')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a point cloud codec on the Goose dataset')
+    parser.add_argument('--codec', type=str, required=True, choices=sorted(CODECS))
+    parser.add_argument('--data_root', type=str, required=True, help='Root of the codec input files')
+    parser.add_argument('--output_root', type=str, default='./analysis',
+                        help='Where the <level>/compressed, <level>/decompressed trees and the CSV are written')
+    parser.add_argument('--levels', nargs='+', type=float, required=True,
+                        help='Quantization levels / error bounds of the codec')
+    parser.add_argument('--csv_name', type=str, default='compression_benchmark.csv',
+                        help='Result CSV in --output_root (rows already in it are skipped)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Runs at once (default: 1 for reno, 4 otherwise)')
+    parser.add_argument('--files_per_run', type=int, default=0,
+                        help='Batched codecs (reno): at most this many files per run (default 0: a whole directory)')
+    parser.add_argument('--input_file_type', type=str, default=None, choices=['bin', 'ply'],
+                        help='Input files for reno / tmc13 (default ply) and quantize (default bin)')
+    # codec options
+    parser.add_argument('--ckpt', type=str, default=None, help='reno: checkpoint')
+    parser.add_argument('--reno_dir', type=str, default=str(Path(__file__).parent / 'RENO'),
+                        help='reno: folder of compressNew.py / decompressToBin.py')
+    parser.add_argument('--in_process', action='store_true',
+                        help='reno: run the scripts inside the worker (torch + checkpoint loaded once)')
+    parser.add_argument('--tmc3', type=str, default='tmc3', help='tmc13: tmc3 executable')
+    parser.add_argument('--tmc13_cfg', type=str, default=str(Path(__file__).parent / 'tmc13GooseCompressScripts/gpcc.cfg'),
+                        help='tmc13: encoder config')
+    parser.add_argument('--lcp', type=str, default='lcp', help='lcp: lcp executable')
+    parser.add_argument('--ply_root', type=str, default=None,
+                        help='lcp: xyz PLY tree matching --data_root (adds orig_bytes_ply)')
+    args = parser.parse_args()
+
+    codec = make_codec(args)
+    csv_path = run_benchmark(codec, args.data_root, args.output_root, args.levels, csv_name=args.csv_name,
+                             workers=args.workers, files_per_run=args.files_per_run)
+    print(f"Results saved to {csv_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import os
+import time
+import argparse
+from pathlib import Path
+
+from goosekit.manifest import MANIFEST_NAME, build_manifest, changed_files, load_manifest, manifest_path
+
+'''
+Build (or refresh) the manifest.parquet of a dataset root: relative path,
+sensor, point count, byte size, mtime and content hash of every scan file.
+
+Once a root has a manifest the conversion / restoration / compression scripts
+list their inputs from it instead of walking the tree. Refreshing re-hashes
+only files whose size or mtime changed, so rebuild it after a stage writes
+new files into the root.
+
+Usage:
+python build_manifest.py \
+  --root /scratch/aniemcz/goose-pointcept/lidar \
+  --pattern '*.bin' \
+  --num_workers 16
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the manifest.parquet catalog of a dataset root')
+    parser.add_argument('--root', '-r', type=str, required=True,
+                        help='Dataset root to catalog')
+    parser.add_argument('--pattern', type=str, default='*',
+                        help="Files to include, matched on the file name (e.g. '*.bin')")
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Re-hash every file instead of reusing unchanged rows of the existing manifest')
+    parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
+                        help='Parallel worker count for hashing')
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    previous = None if args.rebuild else load_manifest(root)
+
+    start = time.perf_counter()
+    df = build_manifest(root, args.pattern, previous, args.num_workers)
+    df.to_parquet(manifest_path(root), index=False)
+
+    n_changed = len(changed_files(df, previous)) if previous is not None else len(df)
+    print(f"{len(df)} files ({n_changed} new or changed), {df['n_points'].clip(lower=0).sum()} points, "
+          f"{df['bytes'].sum() / 1e9:.2f} GB in {time.perf_counter() - start:.1f}s")
+    for sensor, group in df.groupby('sensor'):
+        print(f"  {sensor or '(none)':<8} {len(group):>7} files {group['n_points'].clip(lower=0).sum():>14} points")
+    print(f"Manifest written to {root / MANIFEST_NAME}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,13 @@
 import os
 import argparse
 from pathlib import Path
-import numpy as np
 
 from tqdm import tqdm
 import multiprocessing
 
+from goosekit.binio import read_bin_xyz
+from goosekit.ply import write_ply_ascii
+
 '''
 python create_ascii_ply_xyz_only_dataset.py \
   --input_root ./goose-pointcept/lidar \
@@ -30,27 +32,11 @@ def convert_file(args):
     out_path = output_root / rel_path
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Read binary data as float32, reshape into N x 4
-    data = np.fromfile(bin_path, dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: {data.size}")
-    points = data.reshape(-1, 4)
-    xyz = points[:, :3]
-    num_pts = xyz.shape[0]
+    # Memory-mapped N x 3 xyz view of the .bin (size checked by the reader)
+    xyz = read_bin_xyz(bin_path)
 
-    # Write ASCII PLY
-    with open(out_path, 'w') as ply_file:
-        # Header
-        ply_file.write("ply\n")
-        ply_file.write("format ascii 1.0\n")
-        ply_file.write(f"element vertex {num_pts}\n")
-        ply_file.write("property float x\n")
-        ply_file.write("property float y\n")
-        ply_file.write("property float z\n")
-        ply_file.write("end_header\n")
-        # Body
-        for x, y, z in xyz:
-            ply_file.write(f"{x} {y} {z}\n")
+    # Write ASCII PLY (bulk formatted, round-trip exact float32)
+    write_ply_ascii(out_path, xyz)
     return out_path
 
 def process_files(bin_files, input_root, output_root, num_workers):
@@ -5,6 +5,8 @@ import numpy as np
 from tqdm import tqdm
 from multiprocessing import Pool
 
+from goosekit.stream import DEFAULT_CHUNK_POINTS, RawChunkWriter, iter_label_chunks
+
 """
 Parallel semantic label remapping for Goose dataset:
 - Reads original .label files (uint32 semantics & instance)
@@ -12,6 +14,7 @@ Parallel semantic label remapping for Goose dataset:
 - Maps semantic labels from 0–63 to challenge_category_id per provided mapping
 - Packs back as (instance<<16) | new_semantic
 - Writes out new .label files preserving directory structure
+- Streams each file in chunks (--chunk_points), so merged sequence labels of any size fit
 
 Usage:
 python create_challenge_labels.py \
@@ -92,25 +95,24 @@ SEM_MAP = {
     63:5    # military_vehicle->vehicle
 }
 
+# Lookup table over every 16 bit semantic value; values outside the mapping go to 0
+SEM_LUT = np.zeros(1 << 16, dtype=np.uint32)
+SEM_LUT[list(SEM_MAP)] = list(SEM_MAP.values())
+
 
 def convert_label_file(args):
-    label_path, input_root, output_root = args
+    label_path, input_root, output_root, chunk_points = args
     rel = label_path.relative_to(input_root)
     out_path = output_root / rel
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Load 32-bit label, extract sem/inst
-    data = np.fromfile(str(label_path), dtype=np.uint32)
-    sem = data & 0xFFFF
-    inst = data >> 16
-
-    # Map semantics
-    # Values outside mapping default to 0
-    mapped_sem = np.array([SEM_MAP.get(int(s), 0) for s in sem], dtype=np.uint32)
-
-    # Re-pack instance<<16 | sem
-    out_data = (inst << 16) | mapped_sem
-    out_data.tofile(str(out_path))
+    with RawChunkWriter(out_path, dtype='<u4') as writer:
+        for data in iter_label_chunks(label_path, chunk_points):
+            # 32-bit label: sem in the low, instance in the high 16 bits
+            sem = data & 0xFFFF
+            inst = data >> 16
+            # Map semantics, re-pack instance<<16 | sem
+            writer.write((inst << 16) | SEM_LUT[sem])
     return out_path
 
 
@@ -124,6 +126,8 @@ def main():
                         help='Output directory for mapped labels')
     parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
                         help='Number of parallel workers')
+    parser.add_argument('--chunk_points', type=int, default=DEFAULT_CHUNK_POINTS,
+                        help='Labels remapped per chunk (bounds memory per worker)')
     args = parser.parse_args()
 
     input_root = Path(args.input_root)
@@ -134,7 +138,7 @@ def main():
     label_files = list(input_root.rglob('*.label'))
     print(f"Found {len(label_files)} label files under {input_root}")
 
-    tasks = [(p, input_root, output_root) for p in label_files]
+    tasks = [(p, input_root, output_root, args.chunk_points) for p in label_files]
     with Pool(processes=args.num_workers) as pool:
         for out in tqdm(pool.imap(convert_label_file, tasks), total=len(tasks), desc="Remapping labels"):
             pass
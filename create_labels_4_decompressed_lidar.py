@@ -2,19 +2,34 @@ import os
 import argparse
 from pathlib import Path
 import numpy as np
-import open3d as o3d
-from multiprocessing import Pool
-from tqdm import tqdm
+
+from goosekit.attributes import majority_vote
+from goosekit.binio import read_bin_xyz
+from goosekit.cli import add_nn_args, index_cache_from_args
+from goosekit.index_cache import shared_cache
+from goosekit.labels import label_rel_path, read_label
+from goosekit.neighbors import ScanMatcher
+from goosekit.report import finish_reports, threshold_check
+from goosekit.shards import ShardPacker, open_store
+from goosekit.shm_cache import attach_store
+from goosekit.tasks import group_by_scan, per_root, run_scan_tasks, scan_originals, voxel_sizes_for_roots
 
 """
 Parallel label restoration via nearest-neighbor matching:
 - Reads decompressed BINs for geometry (xyz)
 - Reads original BINs for geometry+intensity, but here we only use xyz
 - Reads original LABEL files to get semantic label per point
-- For each decompressed point, finds nearest original point (KD-tree)
-- Assigns its semantic label if within threshold, else error
+- Finds the nearest original point for all decompressed points in one batched query
+- Assigns its semantic label; per-file distance statistics go to a sidecar report
+  and --threshold_policy handles points beyond --threshold (fail / warn /
+  drop_points, which writes them as unlabelled 0 so the .label stays aligned)
+- With --k > 1 the semantic class is voted among the k nearest original points
+  (ties go to the closer class); the instance id comes from the nearest voter
 - Writes a new .label file (uint32 semantics same bit layout) preserving directory structure
 
+To restore intensity and labels from decompressed PLYs in one pass (one read of
+the original scan, one KD-tree) use transfer_attributes_4_decompressed_lidar.py.
+
 Usage:
 python create_labels_4_decompressed_lidar.py \
   --decomp_bin_root ./analysis/Q_8/decompressed \
@@ -31,112 +46,134 @@ python create_labels_4_decompressed_lidar.py \
   --orig_label_root /scratch/aniemcz/goose-pointcept/labels_challenge \
   --out_label_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge/${Q_lvl} \
   --threshold 0.007
-  
-"""
-
-def read_bin_xyz(bin_path: Path):
-    data = np.fromfile(str(bin_path), dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: {data.size}")
-    pts = data.reshape(-1, 4)
-    return pts[:, :3].astype(np.float32)
 
+# every Q level in one run: each original scan/label is read and indexed once
+python create_labels_4_decompressed_lidar.py \
+  --decomp_bin_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_8 /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_64 /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_512 \
+  --orig_bin_root /scratch/aniemcz/goose-pointcept/lidar \
+  --orig_label_root /scratch/aniemcz/goose-pointcept/labels_challenge \
+  --out_label_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge/Q_8 /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge/Q_64 /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge/Q_512 \
+  --threshold 0.007 0.059 0.45
 
-def read_label(label_path: Path):
-    label = np.fromfile(str(label_path), dtype=np.uint32)
-    sem = label & 0xFFFF
-    inst = label >> 16
-    return sem.astype(np.uint32), inst.astype(np.uint32)
-
+# coarse level: majority vote over the 5 nearest original points
+python create_labels_4_decompressed_lidar.py \
+  --decomp_bin_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/Q_512 \
+  --orig_bin_root /scratch/aniemcz/goose-pointcept/lidar \
+  --orig_label_root /scratch/aniemcz/goose-pointcept/labels_challenge \
+  --out_label_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge_k5/Q_512 \
+  --threshold 0.45 \
+  --k 5
+  
+"""
 
 def convert_labels_nn(args):
-    decomp_bin_path, decomp_bin_root, orig_bin_root, orig_label_root, out_label_root, threshold, no_threshold = args
-    rel = decomp_bin_path.relative_to(decomp_bin_root)
-    
-    # Replace `_vls128` with `_goose` in the filename (keep the directory structure)
-    label_name = rel.stem.replace('_vls128', '_goose').replace('_pcl', '_goose') + '.label'
-    rel_goose = rel.with_name(label_name)
-    
-    orig_bin = orig_bin_root / rel.with_suffix('.bin')
-    orig_label = orig_label_root / rel_goose    
-    out_label = out_label_root / rel_goose    
-    
-    if out_label.exists():
-        return out_label
-    out_label.parent.mkdir(parents=True, exist_ok=True)
-
-    # Load decompressed xyz from BIN
-    xyz_dec = read_bin_xyz(decomp_bin_path)
-    xyz_orig = read_bin_xyz(orig_bin)
-    sem_orig, inst_orig = read_label(orig_label)
-    if xyz_orig.shape[0] != sem_orig.shape[0]:
-        raise ValueError(f"Original point count mismatch: bin {xyz_orig.shape[0]} vs label {sem_orig.shape[0]}")
-    xyz_dec = read_bin_xyz(decomp_bin_path)
-    xyz_orig = read_bin_xyz(orig_bin)
-    sem_orig, inst_orig = read_label(orig_label)
+    """
+    Worker: restore labels for every decompressed version (Q level) of one
+    original scan. The original bin/label are read and indexed once for all of them.
+    """
+    rel, levels, orig_bin_root, orig_label_root, no_threshold, nn_backend, query_threads, match_mode, index_cache, k, threshold_policy, shared = args
+    todo = [lvl for lvl in levels if not lvl[1].exists()]
+    if not todo:
+        return [lvl[1] for lvl in levels], []
+
+    # the original roots may be plain trees or directories of packed shards (or the parent's shared memory)
+    shared_store = attach_store(shared) if shared else None
+    orig_bins = shared_store or open_store(orig_bin_root)
+    xyz_orig = orig_bins.read_bin_xyz(rel)
+    sem_orig, inst_orig = read_label(shared_store or open_store(orig_label_root), label_rel_path(rel))
     if xyz_orig.shape[0] != sem_orig.shape[0]:
         raise ValueError(f"Original point count mismatch: bin {xyz_orig.shape[0]} vs label {sem_orig.shape[0]}")
 
-    # Build KD-tree
-    pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(xyz_orig)
-    tree = o3d.geometry.KDTreeFlann(pcd)
-
-    # Recover labels
-    sem_rec = np.empty((xyz_dec.shape[0],), dtype=np.uint32)
-    inst_rec = np.empty((xyz_dec.shape[0],), dtype=np.uint32)
-    for i, pt in enumerate(xyz_dec):
-        [_, idxs, dists] = tree.search_knn_vector_3d(pt, 1)
-        if not no_threshold:
-            dist = np.sqrt(dists[0])
-            if dist > threshold:
-                raise ValueError(f"No original point within {threshold}m for {decomp_bin_path} index {i} (dist={dist})")
-        idx0 = idxs[0]
-        sem_rec[i] = sem_orig[idx0]
-        inst_rec[i] = inst_orig[idx0]
-
-    # Pack back into uint32 (inst<<16 | sem)
-    out_data = (inst_rec.astype(np.uint32) << 16) | sem_rec.astype(np.uint32)
-    out_data.tofile(str(out_label))
-    return out_label
+    # One index over the original xyz, shared by every Q level
+    cache = shared_cache(*index_cache) if index_cache else None
+    matcher = ScanMatcher(xyz_orig, backend=nn_backend, workers=query_threads,
+                          cache=cache, scan_key=orig_bins.digest(rel) if cache else None)
+
+    rows = []
+    for decomp_bin_path, out_label, threshold, voxel_size in todo:
+        out_label.parent.mkdir(parents=True, exist_ok=True)
+
+        # Load decompressed xyz from BIN and match all points in one batched query
+        xyz_dec = read_bin_xyz(decomp_bin_path)
+        if k > 1:
+            # k nearest originals per point, majority vote on the semantic class
+            knn_dists, knn_idxs = matcher.knn(xyz_dec, k, voxel_size=voxel_size)
+            dists, idxs = knn_dists[:, 0], majority_vote(sem_orig, knn_idxs)
+        else:
+            dists, idxs = matcher.match(xyz_dec, match_mode=match_mode, voxel_size=voxel_size)
+        row, keep = threshold_check(decomp_bin_path, out_label, dists, None if no_threshold else threshold, threshold_policy)
+        rows.append(row)
+        if row['status'] == 'failed':
+            continue
+
+        # Pack back into uint32 (inst<<16 | sem)
+        out_data = (inst_orig[idxs] << 16) | sem_orig[idxs]
+        if keep is not None:
+            # the decompressed bin keeps its points, so far points become unlabelled (0)
+            out_data[~keep] = 0
+        out_data.astype(np.uint32).tofile(str(out_label))
+    return [lvl[1] for lvl in levels if lvl[1].exists()], rows
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Restore semantic labels via NN matching (parallel)'
     )
-    parser.add_argument('--decomp_bin_root', '-p', type=str, required=True,
-                        help='Root of decompressed bins')
+    parser.add_argument('--decomp_bin_root', '-p', type=str, nargs='+', required=True,
+                        help='Root of decompressed bins (several roots, e.g. one per Q level, '
+                             'share one read + index build of each original scan)')
     parser.add_argument('--orig_bin_root', '-b', type=str, required=True,
-                        help='Root of original BINs')
+                        help='Root of original BINs (a directory tree or packed .shard files)')
     parser.add_argument('--orig_label_root', '-l', type=str, required=True,
-                        help='Root of original LABELs')
-    parser.add_argument('--out_label_root', '-o', type=str, required=True,
-                        help='Output root for restored LABELs')
-    parser.add_argument('--threshold', '-t', type=float, default=0.01,
-                        help='Max distance (m) to match nearest point')
+                        help='Root of original LABELs (a directory tree or packed .shard files)')
+    parser.add_argument('--out_label_root', '-o', type=str, nargs='+', required=True,
+                        help='Output root for restored LABELs (one per --decomp_bin_root)')
+    parser.add_argument('--threshold', '-t', type=float, nargs='+', default=[0.01],
+                        help='Max distance (m) to match nearest point (one value, or one per --decomp_bin_root)')
     parser.add_argument('--no_threshold', '-s', action='store_true',
                         help='If specified then turns off threshold sanity check')
     parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
                         help='Parallel worker count')
+    add_nn_args(parser, shm_cache='original scans and labels', drop_points='labels the far points 0 (unlabelled)')
+    parser.add_argument('--k', type=int, default=1,
+                        help='Vote the semantic class among the k nearest original points '
+                             '(k > 1 always uses --nn_backend, not --match_mode)')
     args = parser.parse_args()
 
-    decomp_bin_root = Path(args.decomp_bin_root)
+    if len(args.out_label_root) != len(args.decomp_bin_root):
+        parser.error("--out_label_root needs one root per --decomp_bin_root")
+    if args.k < 1:
+        parser.error("--k must be >= 1")
+    decomp_bin_roots = [Path(p) for p in args.decomp_bin_root]
     orig_bin_root = Path(args.orig_bin_root)
     orig_label_root = Path(args.orig_label_root)
-    out_label_root = Path(args.out_label_root)
-    threshold = args.threshold
+    out_label_roots = [Path(p) for p in args.out_label_root]
+    thresholds = per_root(args.threshold, len(decomp_bin_roots), 'threshold')
+    voxel_sizes = voxel_sizes_for_roots(args.voxel_size, decomp_bin_roots)
     no_threshold = args.no_threshold
     num_workers = args.num_workers
-
-    decomp_bin_files = list(decomp_bin_root.rglob('*.bin'))
-    print(f"Found {len(decomp_bin_files)} decomp bin files under {decomp_bin_root}")
-    tasks = [(p, decomp_bin_root, orig_bin_root, orig_label_root, out_label_root, threshold, no_threshold) for p in decomp_bin_files]
-
-    with Pool(processes=num_workers) as pool:
-        for out in tqdm(pool.imap(convert_labels_nn, tasks), total=len(tasks), desc="Restoring labels NN"):
-            print(f"Restored: {out}")
-
+    index_cache = index_cache_from_args(args)
+
+    # Gather decompressed bins of every root, grouped by original scan
+    groups = group_by_scan(decomp_bin_roots, '*.bin')
+    n_files = sum(len(g) for g in groups.values())
+    print(f"Found {n_files} decomp bin files for {len(groups)} original scans under {len(decomp_bin_roots)} root(s)")
+    packer = ShardPacker(out_label_roots) if args.shard_outputs else None
+    tasks, originals = [], []
+    for rel, members in groups.items():
+        levels = [(p, out_label_roots[i] / label_rel_path(rel), thresholds[i], voxel_sizes[i]) for i, p in members]
+        if packer:
+            # levels packed by an earlier run are done
+            levels = packer.add(rel, levels, lambda lvl: [lvl[1]])
+            if not levels:
+                continue
+        tasks.append((rel, levels, orig_bin_root, orig_label_root, no_threshold,
+                      args.nn_backend, args.query_threads, args.match_mode, index_cache, args.k, args.threshold_policy))
+        originals.append(scan_originals(rel, [lvl[1] for lvl in levels], orig_bin_root, orig_label_root))
+
+    rows = run_scan_tasks(convert_labels_nn, tasks, originals, num_workers, "Restoring labels NN", "Restored",
+                          args.shm_cache_gb, index_cache, packer)
+    finish_reports(rows, args.report, out_label_roots)
     print("Label restoration (NN) complete.")
 
 if __name__ == '__main__':
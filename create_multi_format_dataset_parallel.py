@@ -0,0 +1,235 @@
+import os
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+import multiprocessing
+
+from goosekit.binio import BIN_FIELDS
+from goosekit.ply import write_ply_ascii, write_ply_binary
+from goosekit.quantize import quantize
+from goosekit.shards import ShardPacker, open_store
+from goosekit.stream import ColumnChunkWriter, PlyChunkWriter, QuantizedPlyWriter, RawChunkWriter
+
+'''
+One-pass conversion of the original Goose .bin scans into any subset of the
+derived xyz-only datasets. Each scan is read once and every selected format is
+written from the same in-memory array (instead of one full dataset pass per
+format with create_ascii_ply_xyz_only_dataset_parallel.py,
+create_quantized_ascii_ply_xyz_only_dataset_parallel.py,
+misc/create_lil_endian_ply_xyz_only_dataset.py, misc/create_bin_xyz_only_dataset.py
+and lcpGooseCompressScripts/bin2dat_parallel.py):
+
+  ascii_ply      <output_root>/ply_xyz_only_lidar/<rel>.ply            (round-trip exact)
+  binary_ply     <output_root>/lil_endian_ply_xyz_only_lidar/<rel>.ply
+  xyz_bin        <output_root>/bin_xyz_only_lidar/<rel>.bin            (headerless float32 x y z)
+  lcp_dat        <output_root>/dat_xyz_only_lidar/<rel>_{x,y,z}.dat
+  quantized_ply  <output_root>/quantized_ply_xyz_only_lidar/<rel>.ply  (1 mm, +131072, deduplicated)
+
+--input_root may also be a directory of packed .shard files (shard_dataset.py).
+With --chunk_points the scans are streamed through every format in chunks of
+that many points, so merged sequence maps larger than memory can be converted.
+Existing outputs are skipped unless --overwrite. With --shard_outputs the files of
+every format are packed into one <dir>/<sequence>.shard per format dataset as
+each sequence finishes (see goosekit.shards.ShardPacker). At the end the read
+and every format report files, bytes and throughput (summed over workers).
+
+Usage:
+python create_multi_format_dataset_parallel.py \
+  --input_root /scratch/aniemcz/goose-pointcept/lidar \
+  --output_root /scratch/aniemcz/goose-pointcept \
+  --formats ascii_ply lcp_dat quantized_ply \
+  --num_workers 16
+'''
+
+# format -> dataset folder under --output_root
+FORMATS = {
+    'ascii_ply': 'ply_xyz_only_lidar',
+    'binary_ply': 'lil_endian_ply_xyz_only_lidar',
+    'xyz_bin': 'bin_xyz_only_lidar',
+    'lcp_dat': 'dat_xyz_only_lidar',
+    'quantized_ply': 'quantized_ply_xyz_only_lidar',
+}
+
+
+def output_paths(fmt: str, out_root: Path, rel: Path):
+    if fmt == 'lcp_dat':
+        return [out_root / rel.parent / f"{rel.stem}_{axis}.dat" for axis in 'xyz']
+    if fmt == 'xyz_bin':
+        return [out_root / rel]
+    return [out_root / rel.with_suffix('.ply')]
+
+
+def emit(fmt: str, xyz: np.ndarray, paths):
+    if fmt == 'ascii_ply':
+        write_ply_ascii(paths[0], xyz)
+    elif fmt == 'binary_ply':
+        write_ply_binary(paths[0], xyz)
+    elif fmt == 'xyz_bin':
+        xyz.tofile(paths[0])
+    elif fmt == 'lcp_dat':
+        for axis, path in enumerate(paths):
+            xyz[:, axis].tofile(path)
+    elif fmt == 'quantized_ply':
+        write_ply_ascii(paths[0], quantize(xyz).astype(np.float32))
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {sorted(FORMATS)}")
+
+
+def chunk_writer(fmt: str, paths, n: int, chunk_points: int):
+    if fmt == 'ascii_ply':
+        return PlyChunkWriter(paths[0], n)
+    if fmt == 'binary_ply':
+        return PlyChunkWriter(paths[0], n, binary=True)
+    if fmt == 'xyz_bin':
+        return RawChunkWriter(paths[0])
+    if fmt == 'lcp_dat':
+        return ColumnChunkWriter(paths)
+    if fmt == 'quantized_ply':
+        return QuantizedPlyWriter(paths[0], chunk_points)
+    raise ValueError(f"Unknown format '{fmt}', expected one of {sorted(FORMATS)}")
+
+
+def convert_chunked(xyz_view: np.ndarray, todo: dict, chunk_points: int):
+    """Stream the mapped scan through a writer per format; returns {name: seconds}."""
+    secs = dict.fromkeys(['read', *todo], 0.0)
+    writers = {fmt: chunk_writer(fmt, paths, xyz_view.shape[0], chunk_points) for fmt, paths in todo.items()}
+    for start in range(0, xyz_view.shape[0], chunk_points):
+        t = time.perf_counter()
+        chunk = np.array(xyz_view[start:start + chunk_points])
+        secs['read'] += time.perf_counter() - t
+        for fmt, writer in writers.items():
+            t = time.perf_counter()
+            writer.write(chunk)
+            secs[fmt] += time.perf_counter() - t
+    for fmt, writer in writers.items():
+        t = time.perf_counter()
+        writer.close()
+        secs[fmt] += time.perf_counter() - t
+    return secs
+
+
+def convert_file(args):
+    """Worker: read one scan and write every selected format.
+
+    Returns {name: (seconds, bytes, points)} for 'read' and each format written.
+    """
+    rel, input_root, out_roots, overwrite, chunk_points = args
+
+    todo = {}
+    for fmt, out_root in out_roots.items():
+        paths = output_paths(fmt, out_root, rel)
+        if overwrite or not all(p.exists() for p in paths):
+            todo[fmt] = paths
+    if not todo:
+        return {}
+
+    for paths in todo.values():
+        paths[0].parent.mkdir(parents=True, exist_ok=True)
+
+    if chunk_points > 0:
+        xyz_view = open_store(input_root).read_bin_xyz(rel)
+        n = xyz_view.shape[0]
+        secs = convert_chunked(xyz_view, todo, chunk_points)
+        stats = {'read': (secs['read'], n * BIN_FIELDS * 4, n)}
+        for fmt, paths in todo.items():
+            stats[fmt] = (secs[fmt], sum(p.stat().st_size for p in paths), n)
+        return stats
+
+    start = time.perf_counter()
+    xyz = np.ascontiguousarray(open_store(input_root).read_bin_xyz(rel))
+    stats = {'read': (time.perf_counter() - start, xyz.shape[0] * BIN_FIELDS * 4, xyz.shape[0])}
+
+    for fmt, paths in todo.items():
+        start = time.perf_counter()
+        emit(fmt, xyz, paths)
+        stats[fmt] = (time.perf_counter() - start, sum(p.stat().st_size for p in paths), xyz.shape[0])
+    return stats
+
+
+def print_throughput(totals: dict, wall: float):
+    print(f"\n{'stage':<14} {'files':>7} {'GB':>9} {'worker s':>10} {'MB/s':>9} {'Mpts/s':>8}")
+    for name, (files, secs, nbytes, npts) in totals.items():
+        mb_s = nbytes / secs / 1e6 if secs else float('nan')
+        mpts_s = npts / secs / 1e6 if secs else float('nan')
+        print(f"{name:<14} {files:>7} {nbytes / 1e9:>9.3f} {secs:>10.1f} {mb_s:>9.1f} {mpts_s:>8.2f}")
+    print(f"wall time: {wall:.1f}s (MB/s and Mpts/s are per worker)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Read every Goose .bin scan once and write the selected xyz-only formats"
+    )
+    parser.add_argument(
+        '--input_root', '-i', type=str, required=True,
+        help='Root directory of original Goose lidar .bin files (or of their .shard files)'
+    )
+    parser.add_argument(
+        '--output_root', '-o', type=str, required=True,
+        help='Directory the per-format datasets are created in'
+    )
+    parser.add_argument(
+        '--formats', '-f', type=str, nargs='+', default=sorted(FORMATS), choices=sorted(FORMATS),
+        help='Formats to write (default: all)'
+    )
+    parser.add_argument(
+        '--overwrite', action='store_true',
+        help='Rewrite outputs that already exist'
+    )
+    parser.add_argument(
+        '--num_workers', '-n', type=int, default=os.cpu_count(),
+        help='Number of parallel workers (default: all CPUs)'
+    )
+    parser.add_argument(
+        '--chunk_points', type=int, default=0,
+        help='Stream each scan in chunks of this many points (for merged sequence maps; default 0: whole scan)'
+    )
+    parser.add_argument(
+        '--shard_outputs', action='store_true',
+        help='Pack every format dataset into <dir>/<sequence>.shard files as each sequence finishes '
+             'instead of leaving one file per scan'
+    )
+    args = parser.parse_args()
+    if args.shard_outputs and args.overwrite:
+        parser.error("--overwrite cannot rewrite packed outputs; remove the shards instead")
+
+    input_root = Path(args.input_root)
+    output_root = Path(args.output_root)
+    out_roots = {fmt: output_root / FORMATS[fmt] for fmt in dict.fromkeys(args.formats)}
+
+    bin_files = open_store(input_root).files('*.bin')
+    print(f"Found {len(bin_files)} .bin files, writing {', '.join(out_roots)}")
+    packer = ShardPacker(out_roots.values()) if args.shard_outputs else None
+    tasks = []
+    for rel in bin_files:
+        todo_roots = out_roots
+        if packer:
+            # formats packed by an earlier run are done
+            todo_roots = dict(packer.add(rel, list(out_roots.items()), lambda item: output_paths(*item, rel)))
+            if not todo_roots:
+                continue
+        tasks.append((rel, input_root, todo_roots, args.overwrite, args.chunk_points))
+
+    # stage -> [files, seconds, bytes, points]
+    totals = {name: [0, 0.0, 0, 0] for name in ['read', *out_roots]}
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(processes=args.num_workers) as pool:
+            # in task order with --shard_outputs, so the packer knows which scan finished
+            results = pool.imap(convert_file, tasks) if packer else pool.imap_unordered(convert_file, tasks)
+            for task, stats in tqdm(zip(tasks, results), total=len(tasks), desc="Converting files"):
+                for name, (secs, nbytes, npts) in stats.items():
+                    total = totals[name]
+                    total[0] += 1
+                    total[1] += secs
+                    total[2] += nbytes
+                    total[3] += npts
+                if packer:
+                    packer.finished(task[0])
+    finally:
+        if packer:
+            packer.close()
+
+    print_throughput(totals, time.perf_counter() - start)
+    print("Outputs written under:", output_root)
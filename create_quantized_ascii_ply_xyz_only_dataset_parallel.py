@@ -5,6 +5,11 @@ import numpy as np
 from tqdm import tqdm
 import multiprocessing
 
+from goosekit.binio import read_bin_xyz
+from goosekit.ply import write_ply_ascii
+from goosekit.quantize import quantize
+from goosekit.stream import QuantizedPlyWriter, iter_bin_chunks
+
 '''
 # Create quantized PLY dataset directly from BIN files using fixed quantization
 # Parallel processing with multiprocessing.Pool
@@ -19,52 +24,37 @@ python create_quantized_ascii_ply_xyz_only_dataset_parallel.py \
   --output_root /scratch/aniemcz/goose-pointcept/quantized_ply_xyz_only_lidar
 '''
 
-def quantize(coords: np.ndarray) -> np.ndarray:
-    '''quantize point cloud coords to 18 bit (1mm) precision'''
-    # scale to 1mm, offset to avoid negatives, deduplicate
-    coords = np.round(coords / 0.001) + 131072
-    coords = np.unique(coords, axis=0)
-    return coords
-
-
 def convert_file(args):
     """Worker function for parallel processing"""
-    bin_path, input_root, output_root = args
+    bin_path, input_root, output_root, chunk_points = args
     # Compute relative path and PLY output path
     rel_path = bin_path.relative_to(input_root).with_suffix('.ply')
     out_path = output_root / rel_path
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Read binary data as float32, reshape into N x 4 and extract xyz
-    data = np.fromfile(bin_path, dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: {data.size}")
-    pts = data.reshape(-1, 4)
-    coords = pts[:, :3]
+    if chunk_points > 0:
+        # Large / merged clouds: stream the .bin, only the deduplicated keys are held
+        with QuantizedPlyWriter(out_path, chunk_points) as writer:
+            for chunk in iter_bin_chunks(bin_path, chunk_points):
+                writer.write(chunk)
+        return out_path
+
+    # Memory-mapped N x 3 xyz view of the .bin (size checked by the reader)
+    coords = read_bin_xyz(bin_path)
 
     # Quantize + deduplicate
     coords_q = quantize(coords).astype(np.float32)
-    num_pts = coords_q.shape[0]
-
-    # Write ASCII PLY
-    with open(out_path, 'w') as ply_file:
-        ply_file.write("ply\n")
-        ply_file.write("format ascii 1.0\n")
-        ply_file.write(f"element vertex {num_pts}\n")
-        ply_file.write("property float x\n")
-        ply_file.write("property float y\n")
-        ply_file.write("property float z\n")
-        ply_file.write("end_header\n")
-        for x, y, z in coords_q:
-            ply_file.write(f"{x} {y} {z}\n")
+
+    # Write ASCII PLY (bulk formatted, round-trip exact float32)
+    write_ply_ascii(out_path, coords_q)
 
     return out_path
 
 
-def process_files(bin_files, input_root, output_root, num_workers):
+def process_files(bin_files, input_root, output_root, num_workers, chunk_points=0):
     """Process files in parallel"""
     # Create argument tuples for workers
-    tasks = [(f, input_root, output_root) for f in bin_files]
+    tasks = [(f, input_root, output_root, chunk_points) for f in bin_files]
     
     # Use multiprocessing Pool
     with multiprocessing.Pool(processes=num_workers) as pool:
@@ -92,6 +82,10 @@ if __name__ == '__main__':
         '--num_workers', '-n', type=int, default=os.cpu_count(),
         help='Number of parallel workers (default: CPU count)'
     )
+    parser.add_argument(
+        '--chunk_points', type=int, default=0,
+        help='Stream each .bin in chunks of this many points (for merged sequence maps; default 0: whole scan)'
+    )
     args = parser.parse_args()
 
     input_root = Path(args.input_root)
@@ -101,6 +95,6 @@ if __name__ == '__main__':
     bin_files = list(input_root.rglob('*.bin'))
     print(f"Found {len(bin_files)} BIN files under {input_root}")
 
-    results = process_files(bin_files, input_root, output_root, args.num_workers)
+    results = process_files(bin_files, input_root, output_root, args.num_workers, args.chunk_points)
     
     print(f"Completed writing {len(results)} Quantized XYZ-only ASCII PLY files at:", output_root)
\ No newline at end of file
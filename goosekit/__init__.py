@@ -0,0 +1,7 @@
+'''
+Shared helpers for the Goose compression / restoration scripts.
+
+The scripts in the repo root import from here directly (they are run from the
+repo root, so the package is on sys.path); scripts living in sub folders add
+the repo root to sys.path first.
+'''
@@ -0,0 +1,69 @@
+import numpy as np
+
+'''
+Attribute transfer from the k nearest original points.
+
+Every function takes the (N, k) `dist` / `idx` arrays of one batched k-NN query
+(columns ordered nearest first) and reduces them in a single gather over the
+original attribute array, so there is no per-point Python loop whatever k is.
+'''
+
+WEIGHTINGS = ('nearest', 'inverse_distance', 'gaussian')
+
+# inverse_distance: distances are clamped to this (m) so exact hits dominate without dividing by 0
+MIN_DIST = 1e-6
+
+
+def knn_weights(dist: np.ndarray, weighting: str = 'nearest', sigma: float = None) -> np.ndarray:
+    """(N, k) float64 weights of the k neighbours of each point (not normalized)."""
+    dist = np.asarray(dist, dtype=np.float64)
+    if weighting == 'nearest':
+        w = np.zeros_like(dist)
+        w[:, 0] = 1.0
+        return w
+    if weighting == 'inverse_distance':
+        return 1.0 / np.maximum(dist, MIN_DIST)
+    if weighting == 'gaussian':
+        if not sigma or sigma <= 0:
+            raise ValueError(f"gaussian weighting needs a positive sigma, got {sigma}")
+        # relative to the nearest neighbour so far-off points do not underflow to all-zero weights
+        return np.exp(-(dist ** 2 - dist[:, :1] ** 2) / (2.0 * sigma ** 2))
+    raise ValueError(f"Unknown weighting '{weighting}', expected one of {WEIGHTINGS}")
+
+
+def interpolate(values: np.ndarray, dist: np.ndarray, idx: np.ndarray,
+                weighting: str = 'nearest', sigma: float = None) -> np.ndarray:
+    """Weighted mean of `values` over the k neighbours of each point, as float32 (N,)."""
+    dist = np.asarray(dist)
+    idx = np.asarray(idx)
+    if weighting == 'nearest' or idx.shape[1] == 1:
+        return np.asarray(values)[idx[:, 0]].astype(np.float32)
+    w = knn_weights(dist, weighting, sigma)
+    gathered = np.asarray(values, dtype=np.float64)[idx]
+    return (np.einsum('nk,nk->n', w, gathered) / w.sum(axis=1)).astype(np.float32)
+
+
+def majority_vote(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """Index of the original point whose value wins the vote among each point's k neighbours.
+
+    The most frequent value of the (N, k) neighbour matrix wins; ties go to the
+    value whose closest occurrence is nearest. The returned (N,) index is that
+    closest occurrence, so other per-point attributes (e.g. the instance id) can
+    be gathered consistently with the voted one.
+    """
+    idx = np.asarray(idx)
+    n, k = idx.shape
+    if k == 1 or n == 0:
+        return idx[:, 0]
+    # dense class codes so the per-row histogram is (N, C) with C = classes present
+    _, codes = np.unique(np.asarray(values)[idx], return_inverse=True)
+    codes = codes.reshape(n, k)
+    n_codes = int(codes.max()) + 1
+    rows = np.arange(n)
+    counts = np.bincount((rows[:, None] * n_codes + codes).ravel(), minlength=n * n_codes).reshape(n, n_codes)
+    # column of the nearest occurrence of every class (k where absent)
+    first = np.full((n, n_codes), k, dtype=np.int64)
+    for j in range(k - 1, -1, -1):
+        first[rows, codes[:, j]] = j
+    best = np.argmax(counts * (k + 1) - first, axis=1)
+    return idx[rows, first[rows, best]]
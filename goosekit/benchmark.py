@@ -0,0 +1,205 @@
+import os
+import csv
+import json
+import time
+from pathlib import Path
+from multiprocessing import Pool
+from tqdm import tqdm
+
+from goosekit.manifest import list_files, point_count, sensor_of
+from goosekit.metrics import METRICS_ENV, read_metrics
+
+'''
+One scheduler for every codec benchmark (plugins in goosekit.codecs).
+
+For each level the files of data_root matching the codec's input pattern are
+split into runs (one file each, or for batched codecs the files of one
+directory, at most files_per_run of them), the runs go to a Pool of `workers`,
+and each run's rows are appended to the result CSV as soon as it finishes
+(flushed and fsynced). Outputs are written straight into
+
+    <output_root>/<level_prefix>_<level>/compressed/<rel>
+    <output_root>/<level_prefix>_<level>/decompressed/<rel>
+
+Resume: (codec, level, rel_path) rows already in the CSV are skipped, a line cut
+off by a crash is dropped, and a CSV of one of the old per-codec drivers is
+converted to RESULT_FIELDS once (its quant / eb column becomes `level`, its other
+columns go into `extra`).
+
+Every codec gets the same row, so they can be compared directly:
+    encode_s / decode_s       what the codec reports per file (goosekit.metrics
+                              records or parsed output), else the wall time of a
+                              single-file run
+    orig_bytes / decomp_bytes all files of one input / output (x, y and z for LCP)
+    encode_wall_s / decode_wall_s   wall time of the run as seen by the scheduler
+    run_files                 files in the run (wall times cover all of them)
+    extra                     JSON of the codec's own metrics
+'''
+
+RESULT_FIELDS = [
+    'codec', 'level', 'rel_path', 'full_path', 'sensor', 'n_points',
+    'orig_bytes', 'comp_bytes', 'decomp_bytes', 'ratio', 'bpp',
+    'encode_s', 'decode_s', 'peak_mem_MB', 'encode_wall_s', 'decode_wall_s', 'run_files', 'extra',
+]
+# level column of the old per-codec driver CSVs
+_OLD_LEVEL_COLUMNS = ('quant', 'eb')
+
+NAN = float('nan')
+
+
+def load_done(csv_path: Path, codec) -> set:
+    """(level, rel_path) of every file `codec` already finished according to the result CSV."""
+    import pandas as pd
+    if not csv_path.exists():
+        return set()
+    with open(csv_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+    df = pd.read_csv(csv_path)
+    if list(df.columns) != RESULT_FIELDS:
+        df = _convert_old_csv(df, codec)
+        tmp = csv_path.with_name(f'.{csv_path.name}.tmp-{os.getpid()}')
+        df.to_csv(tmp, index=False)
+        tmp.replace(csv_path)
+    df = df[df['codec'] == codec.name]
+    return {(codec.level_type(level), rel) for level, rel in zip(df['level'], df['rel_path'])}
+
+
+def _convert_old_csv(df, codec):
+    df = df.rename(columns={c: 'level' for c in _OLD_LEVEL_COLUMNS if c in df.columns})
+    if 'codec' not in df.columns:
+        df['codec'] = codec.name
+    others = [c for c in df.columns if c not in RESULT_FIELDS]
+    if others:
+        old_extra = df['extra'] if 'extra' in df.columns else None
+        rows = df[others].to_dict('records')
+        if old_extra is not None:
+            rows = [{**json.loads(e), **r} if isinstance(e, str) else r for e, r in zip(old_extra, rows)]
+        df['extra'] = [json.dumps(r, sort_keys=True) for r in rows]
+    return df.reindex(columns=RESULT_FIELDS)
+
+
+def level_root(out_root: Path, codec, level) -> Path:
+    return out_root / f'{codec.level_prefix}_{level}'
+
+
+def plan_runs(codec, rels, levels, done, files_per_run: int = 0):
+    """[(level, [rel, ...])] of the files still to do; one file per run unless the codec is batched."""
+    runs = []
+    for level in levels:
+        todo = [rel for rel in rels if (level, str(rel)) not in done]
+        if not codec.batched:
+            runs.extend((level, [rel]) for rel in todo)
+            continue
+        # one run per directory: its outputs all go to one folder of the mirrored layout
+        by_dir = {}
+        for rel in todo:
+            by_dir.setdefault(rel.parent, []).append(rel)
+        for files in by_dir.values():
+            step = files_per_run if files_per_run > 0 else len(files)
+            runs.extend((level, files[i:i + step]) for i in range(0, len(files), step))
+    return runs
+
+
+def benchmark_run(args):
+    """Worker: encode + decode the files of one run, return their result rows."""
+    codec, data_root, out_root, level, rels = args
+    root = level_root(out_root, codec, level)
+    inputs = [data_root / rel for rel in rels]
+    comp_paths = [codec.comp_path(root, rel) for rel in rels]
+    decomp_paths = [codec.decomp_path(root, rel) for rel in rels]
+    for p in comp_paths + decomp_paths:
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+    # per-file goosekit.metrics records of this run (one file per worker process)
+    metrics_path = root / f'.metrics-{os.getpid()}.jsonl'
+    metrics_path.unlink(missing_ok=True)
+    os.environ[METRICS_ENV] = str(metrics_path)
+
+    start = time.perf_counter()
+    encode_out = codec.encode(inputs, comp_paths, decomp_paths, level)
+    encoded = time.perf_counter()
+    decode_out = codec.decode(inputs, comp_paths, decomp_paths, level)
+    decoded = time.perf_counter()
+
+    reported = codec.parse_metrics(encode_out, decode_out, inputs)
+    index = codec.record_index(inputs, comp_paths)
+    records = {}
+    for r in read_metrics(metrics_path):
+        i = index.get(os.path.abspath(r['file']))
+        if i is not None:
+            records[(r['stage'], i)] = r
+    metrics_path.unlink(missing_ok=True)
+
+    wall = (encoded - start, decoded - encoded)
+    return [result_row(codec, level, data_root, *files, rep,
+                       records.get(('encode', i), {}), records.get(('decode', i), {}), wall, len(rels))
+            for i, (files, rep) in enumerate(zip(zip(inputs, comp_paths, decomp_paths), reported))]
+
+
+def result_row(codec, level, data_root, src, comp, decomp, reported, enc_rec, dec_rec, wall, run_files):
+    rep = dict(reported)
+    orig_bytes = sum(p.stat().st_size for p in codec.input_files(src))
+    comp_bytes = comp.stat().st_size
+    n_points = rep.pop('n_points', None) or enc_rec.get('n_points') or point_count(src, src.stat().st_size)
+    stream_bytes = rep.pop('bytes', enc_rec.get('bytes', comp_bytes))
+    single = run_files == 1
+    peaks = [r['peak_mem_mb'] for r in (enc_rec, dec_rec) if 'peak_mem_mb' in r]
+    return {
+        'codec': codec.name,
+        'level': level,
+        'rel_path': str(src.relative_to(data_root)),
+        'full_path': str(src.resolve()),
+        'sensor': sensor_of(src),
+        'n_points': n_points,
+        'orig_bytes': orig_bytes,
+        'comp_bytes': comp_bytes,
+        'decomp_bytes': sum(p.stat().st_size for p in codec.decomp_files(decomp)),
+        'ratio': orig_bytes / comp_bytes if comp_bytes else NAN,
+        'bpp': stream_bytes * 8 / n_points if n_points > 0 else NAN,
+        'encode_s': rep.pop('encode_s', enc_rec.get('seconds', wall[0] if single else NAN)),
+        'decode_s': rep.pop('decode_s', dec_rec.get('seconds', wall[1] if single else NAN)),
+        'peak_mem_MB': rep.pop('peak_mem_MB', max(peaks) if peaks else NAN),
+        'encode_wall_s': wall[0],
+        'decode_wall_s': wall[1],
+        'run_files': run_files,
+        'extra': json.dumps(rep, sort_keys=True),
+    }
+
+
+def run_benchmark(codec, data_root, out_root, levels, csv_name: str = 'compression_benchmark.csv',
+                  workers: int = None, files_per_run: int = 0) -> Path:
+    """Benchmark `codec` on every level (see module docstring); returns the result CSV path."""
+    data_root, out_root = Path(data_root), Path(out_root)
+    levels = [codec.level_type(level) for level in levels]
+    workers = workers or codec.default_workers
+
+    # from data_root/manifest.parquet if it exists
+    rels = list_files(data_root, codec.input_pattern)
+    print(f"{len(rels)} files matching {codec.input_pattern} under {data_root}")
+    if not rels:
+        raise FileNotFoundError(f"Could not find any {codec.input_pattern} files at {data_root}")
+
+    csv_path = out_root / csv_name
+    done = load_done(csv_path, codec)
+    if done:
+        print(f"Resuming: {len(done)} ({codec.name}, level, file) results already in {csv_path}")
+    runs = plan_runs(codec, rels, levels, done, files_per_run)
+    tasks = [(codec, data_root, out_root, level, files) for level, files in runs]
+    print(f"{sum(len(files) for _, files in runs)} (level, file) pairs to do in {len(runs)} runs on {workers} worker(s)")
+
+    out_root.mkdir(parents=True, exist_ok=True)
+    write_header = not csv_path.exists()
+    with open(csv_path, 'a', newline='') as f, Pool(workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+            f.flush()
+        for rows in tqdm(pool.imap_unordered(benchmark_run, tasks), total=len(tasks), desc=f"Benchmarking {codec.name}"):
+            writer.writerows(rows)
+            # the rows of a run are on disk before the next one is reported
+            f.flush()
+            os.fsync(f.fileno())
+    return csv_path
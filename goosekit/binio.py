@@ -0,0 +1,43 @@
+import os
+import numpy as np
+
+'''
+Memory-mapped reading of Goose / SemanticKITTI .bin scans (float32 x y z intensity
+per point).
+
+The file is mapped read-only instead of read eagerly, the size is checked once
+here, and xyz / intensity are strided views of the mapping: nothing is copied
+until a caller indexes or converts them, so a worker only pays RSS for the pages
+it actually touches.
+'''
+
+BIN_FIELDS = 4   # x y z intensity
+
+
+def scan_view(floats: np.ndarray, name) -> np.ndarray:
+    """(N, 4) view of the flat float32 values of a scan, with the size check."""
+    if floats.size % BIN_FIELDS != 0:
+        raise ValueError(f"Unexpected float count in {name}: {floats.size}")
+    return floats.reshape(-1, BIN_FIELDS)
+
+
+def map_bin(bin_path) -> np.ndarray:
+    """Read-only float32 (N, 4) view of a .bin scan, backed by a memory map."""
+    size = os.path.getsize(bin_path)
+    if size % 4 != 0:
+        raise ValueError(f"Unexpected float count in {bin_path}: {size / 4}")
+    if size == 0:
+        # mmap cannot map an empty file
+        return np.empty((0, BIN_FIELDS), dtype=np.float32)
+    return scan_view(np.asarray(np.memmap(bin_path, dtype='<f4', mode='r')), bin_path)
+
+
+def read_bin_xyz(bin_path) -> np.ndarray:
+    """(N, 3) xyz view of a .bin scan (no copy)."""
+    return map_bin(bin_path)[:, :3]
+
+
+def read_bin_xyz_intensity(bin_path):
+    """(N, 3) xyz and (N,) intensity views of a .bin scan (no copy)."""
+    pts = map_bin(bin_path)
+    return pts[:, :3], pts[:, 3]
@@ -0,0 +1,61 @@
+from goosekit.index_cache import GB
+from goosekit.neighbors import BACKENDS, MATCH_MODES
+from goosekit.report import REPORT_NAME, THRESHOLD_POLICIES
+
+'''
+Command line options shared by the scripts that match decompressed points to
+the original scans (restore_intensity*, transfer_attributes*, create_labels*,
+backproject_predictions*), so their flags and help texts stay the same.
+'''
+
+
+def add_nn_args(parser, per_root: bool = True, index_cache: bool = True, shm_cache: str = None,
+                drop_points: str = None, report_in: str = 'every output root'):
+    """
+    Add --nn_backend, --query_threads, --voxel_size, --match_mode, --report and
+    --shard_outputs, plus
+
+        index_cache   --index_cache / --index_cache_gb
+        shm_cache     --shm_cache_gb; what is read ahead (e.g. 'original scans and labels')
+        drop_points   --threshold_policy; what drop_points does with the far points
+    """
+    parser.add_argument('--nn_backend', type=str, default='kdtree', choices=sorted(BACKENDS),
+                        help="Neighbour search backend ('voxel' probes the posQ grid around each point, "
+                             "'open3d' is the old per-point KDTreeFlann loop and the only one importing open3d)")
+    parser.add_argument('--query_threads', '-q', type=int, default=1,
+                        help='Threads used by each worker for the batched NN query (-1 = all cores)')
+    if per_root:
+        parser.add_argument('--voxel_size', type=float, nargs='+', default=None,
+                            help="Voxel size (m) for --nn_backend voxel, one value or one per root "
+                                 "(default: posQ x 1 mm taken from the Q_<posQ> folder name)")
+    else:
+        parser.add_argument('--voxel_size', type=float, default=None,
+                            help="Voxel size (m) for --nn_backend voxel "
+                                 "(default: posQ x 1 mm taken from a Q_<posQ> folder of the input root)")
+    parser.add_argument('--match_mode', '-m', type=str, default='nn', choices=MATCH_MODES,
+                        help="'nn': --nn_backend only; 'exact': exact grid-key join, NN for misses; "
+                             "'auto': exact join if every point matches, else NN")
+    if index_cache:
+        parser.add_argument('--index_cache', type=str, default=None,
+                            help='Directory caching the neighbour index of every original scan across runs (off by default)')
+        parser.add_argument('--index_cache_gb', type=float, default=20.0,
+                            help='Size budget of --index_cache in GB; least recently used entries are evicted')
+    if shm_cache:
+        parser.add_argument('--shm_cache_gb', type=float, default=0.0,
+                            help=f'Read the {shm_cache} ahead in the parent into shared memory of at most this '
+                                 'many GB, which workers attach to instead of reading them (default 0: off)')
+    if drop_points:
+        parser.add_argument('--threshold_policy', type=str, default='fail', choices=THRESHOLD_POLICIES,
+                            help="Files with points beyond --threshold: 'fail' skips the file (the run goes on and "
+                                 f"exits non-zero at the end), 'warn' writes it anyway, 'drop_points' {drop_points}")
+    parser.add_argument('--report', type=str, default=None,
+                        help=f'Per-file distance report (.csv or .parquet) (default: {REPORT_NAME} in {report_in})')
+    parser.add_argument('--shard_outputs', action='store_true',
+                        help='Pack the outputs into one <dir>/<sequence>.shard per output root as each sequence '
+                             'finishes instead of leaving one file per scan (read them through a shard root, '
+                             'or restore the files with shard_dataset.py unpack)')
+
+
+def index_cache_from_args(args):
+    """(root, byte budget) of --index_cache for goosekit.index_cache.shared_cache, or None if it is off."""
+    return (args.index_cache, int(args.index_cache_gb * GB)) if args.index_cache else None
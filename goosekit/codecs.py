@@ -0,0 +1,427 @@
+import io
+import os
+import re
+import sys
+import glob
+import time
+import runpy
+import tempfile
+import subprocess
+import contextlib
+from pathlib import Path
+import numpy as np
+
+from goosekit.binio import read_bin_xyz
+from goosekit.metrics import timed
+from goosekit.ply import read_ply, write_ply_ascii
+from goosekit.quantize import QUANT_STEP
+
+'''
+Codec plugins for goosekit.benchmark.run_benchmark (RENO, TMC13, LCP and plain
+grid quantization).
+
+The scheduler hands a codec the files of one run, each with its compressed and
+decompressed path in the mirrored output layout
+(<output_root>/<level_prefix>_<level>/{compressed,decompressed}/<rel>), and calls
+
+    encode(inputs, comp_paths, decomp_paths, level) -> tool output
+    decode(inputs, comp_paths, decomp_paths, level) -> tool output
+    parse_metrics(encode_out, decode_out, inputs)   -> [per-file dict]
+
+A run is one file, or for `batched` codecs (RENO, which loads a model per
+process start) the files of one directory, at most files_per_run of them. The
+per-file dicts may hold encode_s / decode_s / peak_mem_MB / n_points / bytes
+(bitstream size); every other key ends up in the `extra` column of the result
+row. Codecs that time files themselves can also write goosekit.metrics
+records, the scheduler picks them up the same way (record_index maps the file
+a record names to its input).
+'''
+
+
+def run_cmd(cmd):
+    """Run `cmd`, echoing its output (stderr merged) as it arrives; returns the output."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    full_output = []
+    for line in proc.stdout:
+        print(line, end='')
+        full_output.append(line)
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"Command {' '.join(map(str, cmd))} failed with exit code {proc.returncode}")
+    return ''.join(full_output)
+
+
+class _Tee(io.TextIOBase):
+    """Echo writes to `stream` while keeping a copy (in-process version of run_cmd's output capture)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = io.StringIO()
+
+    def write(self, text):
+        self.stream.write(text)
+        self.buffer.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+_CKPT_CACHE = {}
+
+
+def _cached_torch_load():
+    """Make torch.load return the checkpoint already read for the same file (the driver loads it once)."""
+    import torch
+    if getattr(torch.load, '_goose_cached', False):
+        return
+    load = torch.load
+
+    def cached_load(f, *args, **kwargs):
+        if not isinstance(f, (str, os.PathLike)):
+            return load(f, *args, **kwargs)
+        key = os.path.realpath(f)
+        if key not in _CKPT_CACHE:
+            _CKPT_CACHE[key] = load(f, *args, **kwargs)
+        return _CKPT_CACHE[key]
+
+    cached_load._goose_cached = True
+    torch.load = cached_load
+
+
+def run_in_process(cmd):
+    """
+    Run a `python <script> args...` command inside this process and return its
+    output like run_cmd: torch / torchsparse are imported and the checkpoint is
+    read once for every call instead of once per subprocess.
+    """
+    script, argv = Path(cmd[1]), cmd[2:]
+    _cached_torch_load()
+    import torch
+    if torch.cuda.is_available():
+        # the scripts report the peak of their own run
+        torch.cuda.reset_peak_memory_stats()
+
+    tee = _Tee(sys.stdout)
+    saved_argv, saved_path = sys.argv, list(sys.path)
+    sys.argv = [str(script)] + argv
+    sys.path.insert(0, str(script.parent))
+    try:
+        with contextlib.redirect_stdout(tee), contextlib.redirect_stderr(tee):
+            runpy.run_path(str(script), run_name='__main__')
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"Command {' '.join(cmd)} failed with exit code {e.code}")
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+    return tee.buffer.getvalue()
+
+
+def input_glob(files, pattern: str, stage: Path):
+    """
+    Glob covering exactly `files` (all in one directory): the directory itself if
+    they are all of its `pattern` matches, else `stage` filled with symlinks to
+    them (runs resumed part way or split by files_per_run). Returns the glob and
+    the symlinks made ([] for the directory glob).
+    """
+    folder = files[0].parent
+    if {f.name for f in files} == {f.name for f in folder.glob(pattern)}:
+        return str(folder / pattern), []
+    links = [stage / f.name for f in files]
+    for link, f in zip(links, files):
+        link.symlink_to(f.resolve())
+    return str(stage / pattern), links
+
+
+class Codec:
+    """Base of the codec plugins (see the module docstring for the hooks)."""
+
+    name = ''
+    level_prefix = 'Q'      # level folder: <level_prefix>_<level>
+    level_type = float
+    input_pattern = '*.ply'
+    comp_suffix = '.bin'
+    decomp_suffix = '.ply'
+    batched = False
+    default_workers = 4
+
+    def comp_path(self, level_root: Path, rel: Path) -> Path:
+        return level_root / 'compressed' / rel.with_suffix(self.comp_suffix)
+
+    def decomp_path(self, level_root: Path, rel: Path) -> Path:
+        return level_root / 'decompressed' / rel.with_suffix(self.decomp_suffix)
+
+    def input_files(self, src: Path):
+        """Every file the encoder reads for one input (their sizes add up to orig_bytes)."""
+        return [src]
+
+    def decomp_files(self, decomp_path: Path):
+        """Every file the decoder writes for one input (their sizes add up to decomp_bytes)."""
+        return [decomp_path]
+
+    def encode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        raise NotImplementedError
+
+    def decode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        raise NotImplementedError
+
+    def parse_metrics(self, encode_out: str, decode_out: str, inputs) -> list:
+        return [{} for _ in inputs]
+
+    def record_index(self, inputs, comp_paths) -> dict:
+        """{absolute path a goosekit.metrics record may name: index of its input in the run}"""
+        return {os.path.abspath(p): i for i, paths in enumerate(zip(inputs, comp_paths)) for p in paths}
+
+
+# Regex for extracting global metrics from RENO output
+RENO_BPP_PATTERN = re.compile(r"Avg\. Bpp:(?P<bpp>[0-9.]+)")
+RENO_ENC_TIME_PATTERN = re.compile(r"Encode time:(?P<etime>[0-9.]+)")
+RENO_MEM_PATTERN = re.compile(r"Max GPU Memory:(?P<mem>[0-9.]+)MB")
+RENO_DEC_TIME_PATTERN = re.compile(r"Decode Time:(?P<dtime>[0-9.]+)")
+RENO_TOTAL_PATTERN = re.compile(r"Total:\s*(?P<total>\d+)")
+
+
+class RenoCodec(Codec):
+    """
+    RENO through RENO/compressNew.py and RENO/decompressToBin.py, one run per
+    directory: the scripts take a glob and write <stem>.bin / <stem>.ply into an
+    output folder, which is the directory's folder in the mirrored layout.
+    Per-file timings come from goosekit.metrics records if the scripts write
+    them; the batch-wide figures they print go to `extra`.
+
+    in_process keeps torch and the checkpoint loaded, so there every file gets a
+    run of its own inside goosekit.metrics.timed (peak_mem_MB per file), and
+    encode_s / decode_s are the times the scripts print for it. Each run also
+    builds the model and loads its weights again; the whole run, that included,
+    is in encode_run_s / decode_run_s of `extra`.
+    """
+
+    name = 'reno'
+    level_type = int
+    batched = True
+    default_workers = 1
+
+    def __init__(self, reno_dir, ckpt, input_file_type: str = 'ply', in_process: bool = False):
+        self.reno_dir = Path(reno_dir)
+        self.ckpt = Path(ckpt)
+        self.input_pattern = f"*.{input_file_type.lstrip('.')}"
+        self.in_process = in_process
+        self.staged = {}
+        self.run_s = {'encode': [], 'decode': []}
+
+    def _run(self, script: str, args):
+        run = run_in_process if self.in_process else run_cmd
+        return run(['python', str(self.reno_dir / script)] + args)
+
+    def _run_dir(self, script: str, files, pattern: str, dests, args) -> str:
+        # the outputs keep the input's stem, so they go straight to the mirrored folder
+        with tempfile.TemporaryDirectory(prefix='reno-stage-') as stage:
+            files_glob, links = input_glob(files, pattern, Path(stage))
+            self.staged.update({os.path.abspath(link): i for i, link in enumerate(links)})
+            return self._run(script, ['--input_glob', files_glob, '--output_folder', str(dests[0].parent)] + args)
+
+    def _run_each(self, script: str, stage: str, inputs, files, dests, args) -> list:
+        # torch is imported before timed() looks for it, so every file's peak is the CUDA one
+        _cached_torch_load()
+        # the outputs keep the input's stem, so they go straight to their destination folder
+        outs = []
+        for src, f, dest in zip(inputs, files, dests):
+            start = time.perf_counter()
+            with timed(src, stage):
+                outs.append(self._run(script, ['--input_glob', glob.escape(str(f)),
+                                               '--output_folder', str(dest.parent)] + args))
+            self.run_s[stage].append(time.perf_counter() - start)
+        return outs
+
+    def encode(self, inputs, comp_paths, decomp_paths, level):
+        #NOTE: Added new py files to RENO just to prevent file extension stacking (ex: .bin -> .bin.ply or .bin -> .bin.bin)
+        args = ['--ckpt', str(self.ckpt), '--posQ', str(level)]
+        if self.in_process:
+            return self._run_each('compressNew.py', 'encode', inputs, inputs, comp_paths, args)
+        return self._run_dir('compressNew.py', inputs, self.input_pattern, comp_paths, args)
+
+    def decode(self, inputs, comp_paths, decomp_paths, level):
+        args = ['--ckpt', str(self.ckpt)]
+        if self.in_process:
+            return self._run_each('decompressToBin.py', 'decode', inputs, comp_paths, decomp_paths, args)
+        return self._run_dir('decompressToBin.py', comp_paths, '*' + self.comp_suffix, decomp_paths, args)
+
+    def record_index(self, inputs, comp_paths):
+        return {**super().record_index(inputs, comp_paths), **self.staged}
+
+    def parse_metrics(self, encode_out, decode_out, inputs):
+        if self.in_process:
+            # one output per file, its times leave out building the model
+            rows = []
+            for e, d, enc_run, dec_run in zip(encode_out, decode_out, self.run_s['encode'], self.run_s['decode']):
+                row = self._parse_run(e, d)
+                row['encode_s'], row['decode_s'] = row.pop('encode_time_all_s'), row.pop('decode_time_all_s')
+                row['encode_run_s'], row['decode_run_s'] = enc_run, dec_run
+                rows.append(row)
+            return rows
+        batch = self._parse_run(encode_out, decode_out)
+        return [dict(batch) for _ in inputs]
+
+    @staticmethod
+    def _parse_run(encode_out, decode_out):
+        return {
+            'avg_bpp_all': float(RENO_BPP_PATTERN.search(encode_out).group('bpp')),
+            'encode_time_all_s': float(RENO_ENC_TIME_PATTERN.search(encode_out).group('etime')),
+            'decode_time_all_s': float(RENO_DEC_TIME_PATTERN.search(decode_out).group('dtime')),
+            'max_gpu_mem_MB': float(RENO_MEM_PATTERN.search(encode_out).group('mem')),
+            'batch_total_files': int(RENO_TOTAL_PATTERN.search(encode_out).group('total')),
+            'batch_total_files_dec': int(RENO_TOTAL_PATTERN.search(decode_out).group('total')),
+        }
+
+
+TMC13_BITSTREAM_PATTERN = re.compile(r"positions bitstream size (?P<bsz>\d+) B \((?P<bpp>[0-9.]+) bpp\)")
+TMC13_ENC_TIME_PATTERN = re.compile(r"positions processing time.*: (?P<etime>[0-9.]+) s")
+TMC13_DEC_TIME_PATTERN = re.compile(r"Processing time \(wall\): (?P<dtime>[0-9.]+) s")
+
+
+class Tmc13Codec(Codec):
+    """MPEG G-PCC reference encoder (tmc3), one file per run."""
+
+    name = 'tmc13'
+
+    def __init__(self, tmc3, cfg_path, input_file_type: str = 'ply'):
+        self.tmc3 = str(tmc3)
+        self.cfg_path = str(cfg_path)
+        self.input_pattern = f"*.{input_file_type.lstrip('.')}"
+
+    def encode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        return run_cmd([
+            self.tmc3,
+            '--mode=0',
+            f'--config={self.cfg_path}',
+            f'--positionQuantizationScale={level}',
+            f'--uncompressedDataPath={inputs[0]}',
+            f'--compressedStreamPath={comp_paths[0]}',
+        ])
+
+    def decode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        return run_cmd([
+            self.tmc3,
+            '--mode=1',
+            f'--compressedStreamPath={comp_paths[0]}',
+            f'--reconstructedDataPath={decomp_paths[0]}',
+        ])
+
+    def parse_metrics(self, encode_out, decode_out, inputs):
+        m_b = TMC13_BITSTREAM_PATTERN.search(encode_out)
+        return [{
+            'bytes': int(m_b.group('bsz')),
+            'encode_s': float(TMC13_ENC_TIME_PATTERN.search(encode_out).group('etime')),
+            'decode_s': float(TMC13_DEC_TIME_PATTERN.search(decode_out).group('dtime')),
+            'tmc13_bpp': float(m_b.group('bpp')),
+        }]
+
+
+# LCP output patterns
+LCP_RATIO_PATTERN = re.compile(r"compression ratio = (?P<ratio>[0-9.]+)")
+LCP_CTIME_PATTERN = re.compile(r"compression time = (?P<ctime>[0-9.]+)")
+LCP_D_TIME_PATTERN = re.compile(r"decompression time = (?P<dtime>[0-9.]+)")
+LCP_AXIS_STATS_PATTERN = re.compile(
+    r"statistics of (?P<axis>[xyz])\s+Min=(?P<min>[0-9\.\-E]+), "
+    r"Max=(?P<max>[0-9\.\-E]+), range=(?P<range>[0-9\.\-E]+)"
+)
+LCP_ABS_ERR_PATTERN = re.compile(r"Max absolute error = (?P<abs_err>[0-9\.\-E]+)")
+LCP_REL_ERR_PATTERN = re.compile(r"Max relative error = (?P<rel_err>[0-9\.\-E]+)")
+LCP_PSNR_PATTERN = re.compile(r"PSNR = (?P<psnr>[0-9\.\-E]+)")
+LCP_NRMSE_PATTERN = re.compile(r"NRMSE=\s*(?P<nrmse>[0-9\.\-E]+)")
+
+
+def lcp_axis_path(x_path: Path, axis: str) -> Path:
+    """The `_<axis>.dat` sibling of an `_x.dat` file."""
+    return x_path.with_name(x_path.name[:-len('_x.dat')] + f'_{axis}.dat')
+
+
+class LcpCodec(Codec):
+    """
+    LCP error-bounded compressor on the per-axis float32 .dat files (inputs are
+    the *_x.dat files, _y / _z are their siblings), one file per run. A single
+    lcp call compresses and decompresses, so encode does both and decode is a
+    no-op; the times lcp reports for each stage are in encode_s / decode_s.
+    """
+
+    name = 'lcp'
+    level_prefix = 'EB'
+    input_pattern = '*_x.dat'
+    comp_suffix = '.lcp'
+    decomp_suffix = '.dat'
+
+    def __init__(self, lcp, data_root=None, ply_root=None):
+        self.lcp = str(lcp)
+        self.data_root = Path(data_root) if data_root else None
+        self.ply_root = Path(ply_root) if ply_root else None
+
+    def input_files(self, src):
+        return [lcp_axis_path(src, a) for a in 'xyz']
+
+    def decomp_files(self, decomp_path):
+        return [lcp_axis_path(decomp_path, a) for a in 'xyz']
+
+    def encode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        x = inputs[0]
+        n = x.stat().st_size // 4
+        return run_cmd([
+            self.lcp,
+            '-i', *[str(lcp_axis_path(x, a)) for a in 'xyz'],
+            '-z', str(comp_paths[0]),
+            '-o', *[str(p) for p in self.decomp_files(decomp_paths[0])],
+            '-1', str(n),
+            '-eb', str(level), '-bt', '1', '-a'
+        ])
+
+    def decode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        return ''
+
+    def parse_metrics(self, encode_out, decode_out, inputs):
+        out = encode_out
+        row = {
+            'encode_s': float(LCP_CTIME_PATTERN.search(out).group('ctime')),
+            'decode_s': float(LCP_D_TIME_PATTERN.search(out).group('dtime')),
+            'compression_ratio': float(LCP_RATIO_PATTERN.search(out).group('ratio')),
+        }
+        for m in LCP_AXIS_STATS_PATTERN.finditer(out):
+            for key in ('min', 'max', 'range'):
+                row[f"{key}_{m.group('axis')}"] = float(m.group(key))
+        nrmse = float(LCP_NRMSE_PATTERN.search(out).group('nrmse'))
+        errors = zip(LCP_ABS_ERR_PATTERN.findall(out), LCP_REL_ERR_PATTERN.findall(out), LCP_PSNR_PATTERN.findall(out))
+        for axis, (abs_err, rel_err, psnr) in zip('xyz', errors):
+            row.update({f'abs_err_{axis}': float(abs_err), f'rel_err_{axis}': float(rel_err),
+                        f'psnr_{axis}': float(psnr), f'nrmse_{axis}': nrmse})
+        if self.ply_root is not None and self.data_root is not None:
+            # size of the matching xyz PLY, for comparing against the other codecs
+            rel = str(inputs[0].relative_to(self.data_root))
+            row['orig_bytes_ply'] = (self.ply_root / rel.replace('_x.dat', '.ply')).stat().st_size
+        return [row]
+
+
+class QuantizeCodec(Codec):
+    """
+    Baseline without entropy coding: the points snapped to a grid of
+    level x 1 mm (the posQ of RENO), deduplicated and stored as raw int32 cells;
+    decoding writes the cell centres as an ASCII PLY.
+    """
+
+    name = 'quantize'
+    level_type = int
+
+    def __init__(self, input_file_type: str = 'bin'):
+        self.input_pattern = f"*.{input_file_type.lstrip('.')}"
+
+    def encode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        src = inputs[0]
+        xyz = read_bin_xyz(src) if src.suffix == '.bin' else read_ply(src)
+        cells = np.unique(np.round(xyz / (level * QUANT_STEP)).astype(np.int32), axis=0)
+        cells.tofile(str(comp_paths[0]))
+        return ''
+
+    def decode(self, inputs, comp_paths, decomp_paths, level) -> str:
+        cells = np.fromfile(str(comp_paths[0]), dtype=np.int32).reshape(-1, 3)
+        write_ply_ascii(decomp_paths[0], (cells * (level * QUANT_STEP)).astype(np.float32))
+        return ''
+
+
+CODECS = {c.name: c for c in (RenoCodec, Tmc13Codec, LcpCodec, QuantizeCodec)}
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import functools
+from pathlib import Path
+import numpy as np
+
+'''
+Persistent on-disk cache of the neighbour indexes built over original scans.
+
+Every restoration / label-transfer run used to rebuild the same KD-tree for the
+same original .bin. With a cache directory the serialized search structure
+(KD-tree nodes + point permutation, or the sorted voxel / grid keys) is stored
+once per scan, keyed by the content hash of the .bin, and warm runs memory-map
+it back instead of building.
+
+Layout:
+    <root>/<scan digest>-<kind>[-<params>]/
+        meta.json        fields, params, byte size
+        <field>.npy      one array per field of the index's cache_state()
+
+The cache is bounded: entry directories carry their last use as mtime, and the
+least recently used ones are deleted once the total size exceeds the budget.
+Writers build in a private temp dir and rename it into place, so pool workers
+can share one cache directory; temp dirs left behind by crashed writers are
+removed by the next eviction pass once they are STALE_TMP_S old.
+'''
+
+GB = 1 << 30
+# a writer only needs seconds to save one entry
+STALE_TMP_S = 600
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Content hash of a file (blake2b, 128 bit hex)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IndexCache:
+    def __init__(self, root, max_bytes: int, evict_every: int = 32):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+
+    def _entry(self, scan_key: str, kind: str, params: dict) -> Path:
+        parts = [scan_key, kind] + [f"{k}{params[k]:g}" for k in sorted(params)]
+        if kind == 'kdtree':
+            # the serialized node layout belongs to the scipy version that wrote it
+            import scipy
+            parts.append(f"scipy{scipy.__version__}")
+        return self.root / '-'.join(parts)
+
+    def get_or_build(self, scan_key: str, kind: str, cls, xyz: np.ndarray, build, **params):
+        """Load the `kind` index of a scan from the cache, or `build()` and store it."""
+        entry = self._entry(scan_key, kind, params)
+        index = self._load(entry, cls, xyz)
+        if index is not None:
+            self.hits += 1
+            return index
+        self.misses += 1
+        index = build()
+        self._store(entry, index.cache_state(), params)
+        return index
+
+    def _load(self, entry: Path, cls, xyz: np.ndarray):
+        try:
+            meta = json.loads((entry / 'meta.json').read_text())
+            state = {field: np.load(entry / f'{field}.npy', mmap_mode='r') for field in meta['fields']}
+            os.utime(entry)   # mtime = last use, for LRU eviction
+        except (OSError, ValueError, KeyError):
+            # missing, or evicted by another worker while we were reading: rebuild
+            return None
+        return cls.from_cache_state(xyz, state)
+
+    def _store(self, entry: Path, state: dict, params: dict):
+        tmp = self.root / f'.tmp-{uuid.uuid4().hex}'
+        tmp.mkdir()
+        size = 0
+        for field, arr in state.items():
+            np.save(tmp / f'{field}.npy', np.asarray(arr))
+            size += (tmp / f'{field}.npy').stat().st_size
+        (tmp / 'meta.json').write_text(json.dumps({'fields': list(state), 'params': params, 'bytes': size}))
+        try:
+            tmp.rename(entry)
+        except OSError:
+            # another worker stored the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self._stores += 1
+        if self._stores % self.evict_every == 0:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache is back under 90% of its budget."""
+        entries = []
+        now = time.time()
+        for e in os.scandir(self.root):
+            if e.name.startswith('.tmp-'):
+                try:
+                    if now - e.stat().st_mtime > STALE_TMP_S:
+                        shutil.rmtree(e.path, ignore_errors=True)
+                except OSError:
+                    pass   # renamed into place or swept by another worker
+                continue
+            try:
+                size = json.loads(Path(e.path, 'meta.json').read_text())['bytes']
+                entries.append((e.stat().st_mtime, size, e.path))
+            except (OSError, ValueError, KeyError):
+                continue
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            if total <= 0.9 * self.max_bytes:
+                break
+
+
+@functools.lru_cache(maxsize=None)
+def shared_cache(root: str, max_bytes: int) -> IndexCache:
+    """One IndexCache per process, so pool workers keep their eviction counters across tasks."""
+    return IndexCache(root, max_bytes)
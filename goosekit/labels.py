@@ -0,0 +1,21 @@
+from pathlib import Path
+import numpy as np
+
+'''
+Goose .label files: one uint32 per point, semantic class in the low 16 bits and
+instance id in the high 16 bits. The label of a scan has the scan's name with
+its sensor suffix (`_vls128` / `_pcl`) replaced by `_goose`.
+'''
+
+
+def label_rel_path(rel: Path):
+    # Replace `_vls128` / `_pcl` with `_goose` in the filename (keep the directory structure)
+    return rel.with_name(rel.stem.replace('_vls128', '_goose').replace('_pcl', '_goose') + '.label')
+
+
+def read_label(store, rel: Path):
+    """(semantic, instance) uint32 arrays of the .label `rel` of a store (see goosekit.shards.open_store)."""
+    label = store.array(rel, np.uint32)
+    sem = label & 0xFFFF
+    inst = label >> 16
+    return sem.astype(np.uint32), inst.astype(np.uint32)
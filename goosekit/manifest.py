@@ -0,0 +1,161 @@
+import os
+import fnmatch
+import warnings
+from pathlib import Path
+from multiprocessing import Pool
+
+from goosekit.index_cache import file_digest
+from goosekit.ply import read_ply_header
+
+'''
+Dataset manifest: one parquet file per dataset root listing every scan file with
+
+    rel_path   path relative to the root (posix)
+    sensor     'vls128' / 'pcl' from the scan name ('' if it has no sensor suffix)
+    n_points   points in the file (from the size for .bin / .label / .dat, the
+               header for .ply; -1 for anything else)
+    bytes, mtime_ns
+    hash       blake2b content digest (same as index_cache.file_digest)
+
+Stages list their inputs from <root>/manifest.parquet when it exists and is
+current (list_files) instead of re-walking 30k+ files, and can plan on the point
+counts (e.g. shard sizes) or skip files whose hash did not change
+(changed_files). A manifest is current while no directory under the root has
+been modified after it was written (adding, removing or renaming a file bumps
+its directory's mtime); checking that only lists the directories, no file is
+stat'ed. Rebuilding only re-hashes files whose size or mtime changed.
+'''
+
+MANIFEST_NAME = 'manifest.parquet'
+MANIFEST_COLUMNS = ['rel_path', 'sensor', 'n_points', 'bytes', 'mtime_ns', 'hash']
+SENSORS = ('vls128', 'pcl')
+# bytes per point of the headerless formats
+POINT_BYTES = {'.bin': 16, '.label': 4, '.dat': 4}
+
+
+def manifest_path(root) -> Path:
+    return Path(root) / MANIFEST_NAME
+
+
+def sensor_of(rel) -> str:
+    sensor = Path(rel).stem.rsplit('_', 1)[-1]
+    return sensor if sensor in SENSORS else ''
+
+
+def point_count(path: Path, size: int) -> int:
+    if path.suffix in POINT_BYTES:
+        return size // POINT_BYTES[path.suffix]
+    if path.suffix == '.ply':
+        return read_ply_header(path).vertex_count()
+    return -1
+
+
+def walk_files(root, pattern: str = '*'):
+    """
+    (rel, bytes, mtime_ns) of every file under root whose name matches `pattern`
+    (one scandir pass). Hidden directories are skipped: they hold scratch state
+    such as the temp dirs of an interrupted writer, not dataset files.
+    """
+    root = Path(root)
+    found = []
+    stack = [root] if root.is_dir() else []
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(Path(entry.path))
+                elif fnmatch.fnmatch(entry.name, pattern) and entry.name != MANIFEST_NAME:
+                    st = entry.stat()
+                    found.append((Path(entry.path).relative_to(root), st.st_size, st.st_mtime_ns))
+    return sorted(found)
+
+
+def describe_file(args):
+    """Worker: manifest row of one file (hashes it)."""
+    root, rel, size, mtime_ns = args
+    path = root / rel
+    return {
+        'rel_path': rel.as_posix(),
+        'sensor': sensor_of(rel),
+        'n_points': point_count(path, size),
+        'bytes': size,
+        'mtime_ns': mtime_ns,
+        'hash': file_digest(path),
+    }
+
+
+def build_manifest(root, pattern: str = '*', previous=None, num_workers: int = 1):
+    """Manifest DataFrame of `root`; rows of `previous` are reused for files with unchanged size and mtime."""
+    import pandas as pd
+    root = Path(root)
+    known = {}
+    if previous is not None:
+        known = {row['rel_path']: row for row in previous.to_dict('records')}
+
+    rows, tasks = [], []
+    for rel, size, mtime_ns in walk_files(root, pattern):
+        old = known.get(rel.as_posix())
+        if old is not None and old['bytes'] == size and old['mtime_ns'] == mtime_ns:
+            rows.append(old)
+        else:
+            tasks.append((root, rel, size, mtime_ns))
+
+    if tasks:
+        with Pool(processes=num_workers) as pool:
+            rows.extend(pool.imap_unordered(describe_file, tasks, chunksize=16))
+    df = pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+    return df.sort_values('rel_path', ignore_index=True)
+
+
+def load_manifest(root):
+    """The manifest of `root`, or None if it has not been built."""
+    path = manifest_path(root)
+    if not path.exists():
+        return None
+    # imported on use: roots without a manifest (and pool workers) never load pandas
+    import pandas as pd
+    return pd.read_parquet(path)
+
+
+def manifest_is_current(root) -> bool:
+    """True if no directory under root changed (file added, removed or renamed) after its manifest was written."""
+    built = manifest_path(root).stat().st_mtime_ns
+    stack = [Path(root)]
+    while stack:
+        d = stack.pop()
+        if d.stat().st_mtime_ns > built:
+            return False
+        with os.scandir(d) as it:
+            stack.extend(Path(entry.path) for entry in it
+                         if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'))
+    return True
+
+
+def current_manifest(root):
+    """The manifest of `root` if it has one that is still current, else None."""
+    df = load_manifest(root)
+    if df is not None and not manifest_is_current(root):
+        warnings.warn(f"{manifest_path(root)} is older than the files under {root}, walking the tree instead "
+                      f"(rerun build_manifest.py to refresh it)")
+        return None
+    return df
+
+
+def list_files(root, pattern: str = '*'):
+    """Sorted relative paths of the files matching `pattern` (on the name, like rglob) under root.
+
+    Read from the root's manifest if it is current, else found by walking the tree.
+    """
+    df = current_manifest(root)
+    if df is None:
+        return [rel for rel, _, _ in walk_files(root, pattern)]
+    names = df['rel_path'].str.rsplit('/', n=1).str[-1]
+    return [Path(rel) for rel in df['rel_path'][names.map(lambda n: fnmatch.fnmatch(n, pattern))]]
+
+
+def changed_files(manifest, previous):
+    """rel_paths of `manifest` that are new or whose hash differs from `previous`."""
+    old = dict(zip(previous['rel_path'], previous['hash']))
+    return [rel for rel, h in zip(manifest['rel_path'], manifest['hash']) if old.get(rel) != h]
+
@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import time
+import resource
+import contextlib
+from pathlib import Path
+
+'''
+Per-file codec metrics as JSON lines.
+
+A benchmark driver sets GOOSE_METRICS_JSONL to a file before it runs a codec
+(as a subprocess or in process); the codec script wraps the work on every file
+in timed(), which appends one record per file and stage:
+
+    {"file": "<input path>", "stage": "encode" | "decode", "seconds": 0.041,
+     "peak_mem_mb": 812.5, "n_points": 131072, "bytes": 40960}
+
+    with timed(path, 'encode') as rec:
+        stream = net.compress(x)
+        rec['n_points'], rec['bytes'] = len(x), len(stream)
+
+peak_mem_mb is the CUDA peak of that file when torch is loaded and has a GPU,
+else the process peak RSS so far. Without the variable timed() only runs the
+block, so the scripts behave as before when they are run by hand.
+'''
+
+METRICS_ENV = 'GOOSE_METRICS_JSONL'
+
+
+def _cuda():
+    torch = sys.modules.get('torch')
+    return torch.cuda if torch is not None and torch.cuda.is_available() else None
+
+
+def emit(record: dict):
+    """Append `record` to the metrics file named by GOOSE_METRICS_JSONL (no-op if unset)."""
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+@contextlib.contextmanager
+def timed(file, stage: str):
+    """Time the block and emit its record; fields set on the yielded dict are added to it."""
+    cuda = _cuda()
+    if cuda:
+        cuda.synchronize()
+        cuda.reset_peak_memory_stats()
+    rec = {}
+    start = time.perf_counter()
+    yield rec
+    if cuda:
+        cuda.synchronize()
+        peak = cuda.max_memory_allocated() / 2**20
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    emit({'file': str(file), 'stage': stage, 'seconds': time.perf_counter() - start,
+          'peak_mem_mb': peak, **rec})
+
+
+def read_metrics(path) -> list:
+    """Records of a metrics file ([] if it does not exist)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,411 @@
+import numpy as np
+
+'''
+Nearest-neighbour backends used to carry attributes from the original scans over
+to decompressed geometry.
+
+Every backend is built once over the original xyz and answers a whole batch of
+queries in one call:
+
+    index = build_index(xyz_orig, backend='kdtree')
+    dist, idx = index.query(xyz_dec, k=1, workers=4)   # both (N, k)
+
+Neighbours of a query point are ordered by (distance, original index), so exact
+ties (e.g. duplicated points in the original scan) always resolve to the lowest
+original index, whichever backend answered.
+'''
+
+
+def _order_rows(dist, idx):
+    """Sort every row of (dist, idx) by distance, then by index."""
+    order = np.lexsort((idx, dist), axis=-1)
+    return np.take_along_axis(dist, order, axis=-1), np.take_along_axis(idx, order, axis=-1)
+
+
+class KDTreeIndex:
+    """scipy cKDTree over the original xyz, queried in one vectorized call.
+
+    Coordinates are promoted to float64 just like Open3D's Vector3dVector does,
+    so distances match the old KDTreeFlann loop.
+    """
+
+    def __init__(self, xyz: np.ndarray):
+        # imported here so the voxel / exact-grid paths only need NumPy
+        from scipy.spatial import cKDTree
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.tree = cKDTree(self.xyz)
+
+    def query(self, pts: np.ndarray, k: int = 1, workers: int = 1):
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 3)
+        n_orig = self.xyz.shape[0]
+        # Ask for one extra neighbour: if it is as close as the k-th one the tree
+        # had to choose arbitrarily between tied points and we redo that row.
+        k_query = min(k + 1, n_orig)
+        dist, idx = self.tree.query(pts, k=k_query, workers=workers)
+        dist = dist.reshape(-1, k_query)
+        idx = idx.reshape(-1, k_query)
+
+        if k_query > k:
+            tied = np.flatnonzero(dist[:, k - 1] == dist[:, k])
+            for row in tied:
+                dist[row, :k], idx[row, :k] = self._resolve_tie(pts[row], dist[row, k - 1], k)
+            dist, idx = dist[:, :k], idx[:, :k]
+
+        return _order_rows(dist, idx)
+
+    def _resolve_tie(self, pt, radius, k):
+        # Grow the query until every point at distance <= radius is included,
+        # then keep the k smallest (distance, index) pairs.
+        n_orig = self.xyz.shape[0]
+        m = 2 * (k + 1)
+        while True:
+            m = min(m, n_orig)
+            dist, idx = self.tree.query(pt, k=m)
+            if m == n_orig or dist[-1] > radius:
+                break
+            m *= 2
+        order = np.lexsort((idx, dist))[:k]
+        return dist[order], idx[order]
+
+    # The tree nodes + point permutation, for goosekit.index_cache. The points
+    # themselves are not stored: they come from the (content-hashed) scan.
+    def cache_state(self):
+        tree_buffer, _, _, _, leafsize, maxes, mins, indices, _, _ = self.tree.__getstate__()
+        return {'tree_buffer': tree_buffer, 'maxes': maxes, 'mins': mins,
+                'indices': indices, 'leafsize': np.asarray(leafsize)}
+
+    @classmethod
+    def from_cache_state(cls, xyz, state):
+        from scipy.spatial import cKDTree
+        self = cls.__new__(cls)
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.tree = cKDTree.__new__(cKDTree)
+        self.tree.__setstate__((state['tree_buffer'], self.xyz, self.xyz.shape[0], 3, int(state['leafsize']),
+                                state['maxes'], state['mins'], state['indices'], None, None))
+        return self
+
+
+class Open3DIndex:
+    """Open3D KDTreeFlann queried one point at a time.
+
+    This is the original per-point loop, kept as a reference to diff the batched
+    backends against. It ignores `workers`.
+    """
+
+    def __init__(self, xyz: np.ndarray):
+        import open3d as o3d
+        pcd = o3d.geometry.PointCloud()
+        pcd.points = o3d.utility.Vector3dVector(np.asarray(xyz, dtype=np.float32))
+        self.tree = o3d.geometry.KDTreeFlann(pcd)
+
+    def query(self, pts: np.ndarray, k: int = 1, workers: int = 1):
+        pts = np.asarray(pts).reshape(-1, 3)
+        dist = np.empty((pts.shape[0], k), dtype=np.float64)
+        idx = np.empty((pts.shape[0], k), dtype=np.int64)
+        for i, pt in enumerate(pts):
+            try:
+                [_, idxs, dists] = self.tree.search_knn_vector_3d(pt, k)
+            except RuntimeError:
+                raise RuntimeError(f"KD-tree lookup failed for point index {i}")
+            dist[i] = np.sqrt(np.asarray(dists))
+            idx[i] = np.asarray(idxs)
+        return _order_rows(dist, idx)
+
+
+# 3x3x3 block of voxel offsets probed around a query's own voxel
+_BLOCK_OFFSETS = np.array([(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)],
+                          dtype=np.int64)
+
+
+class VoxelHashIndex:
+    """Original points hashed into cubic voxels of `voxel_size` metres.
+
+    Meant for RENO output, which lies on a grid of posQ x 1 mm: with the voxel
+    set to that spacing, voxels are centred on the grid points, so a decompressed
+    point shares its voxel with the original points that quantized onto it. A
+    query first looks at its own voxel and only probes the 27 voxels around it
+    when its own voxel cannot prove the answer, instead of descending a tree
+    through the many original points that share a voxel at coarse Q levels.
+
+    A neighbour is only accepted when it is closer than anything outside the
+    probed voxels could be; rows where that does not hold are answered by a
+    KD-tree, which keeps the results equal to KDTreeIndex, ties included.
+    """
+
+    def __init__(self, xyz: np.ndarray, voxel_size: float, max_candidates: int = 1 << 22):
+        if not voxel_size or voxel_size <= 0:
+            raise ValueError(f"The voxel backend needs a positive voxel_size, got {voxel_size}")
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.voxel_size = float(voxel_size)
+        self.max_candidates = max_candidates
+        keys = pack_cells(self._cells(self.xyz))
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self._fallback = None
+
+    def _cells(self, xyz):
+        return np.round(xyz / self.voxel_size).astype(np.int64)
+
+    def cache_state(self):
+        return {'voxel_size': np.asarray(self.voxel_size), 'order': self.order,
+                'keys': self.keys, 'starts': self.starts, 'counts': self.counts}
+
+    @classmethod
+    def from_cache_state(cls, xyz, state):
+        self = cls.__new__(cls)
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.voxel_size = float(state['voxel_size'])
+        self.max_candidates = 1 << 22
+        self.order, self.keys, self.starts, self.counts = state['order'], state['keys'], state['starts'], state['counts']
+        self._fallback = None
+        return self
+
+    def query(self, pts: np.ndarray, k: int = 1, workers: int = 1):
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 3)
+        cells = self._cells(pts)
+        # Distance from a query to the faces of its own voxel / of the 3x3x3 block;
+        # nothing outside them can be closer than that (shaved for rounding).
+        shave = 1 - 1e-9
+        own_margin = (self.voxel_size / 2 - np.abs(pts - cells * self.voxel_size).max(axis=1)) * shave
+
+        dist, idx = self._probe(pts, cells, _BLOCK_OFFSETS[13:14], k)
+        rest = np.flatnonzero(~(dist[:, k - 1] < own_margin))
+        if rest.size:
+            dist[rest], idx[rest] = self._probe(pts[rest], cells[rest], _BLOCK_OFFSETS, k)
+            unsure = rest[~(dist[rest, k - 1] < self.voxel_size * shave)]
+            if unsure.size:
+                if self._fallback is None:
+                    self._fallback = KDTreeIndex(self.xyz)
+                dist[unsure], idx[unsure] = self._fallback.query(pts[unsure], k=k, workers=workers)
+        return dist, idx
+
+    def _probe(self, pts, cells, offsets, k):
+        """k nearest among the original points in the voxels `cells + offsets` of every query."""
+        n, n_off = pts.shape[0], len(offsets)
+        dist = np.full((n, k), np.inf)
+        idx = np.full((n, k), -1, dtype=np.int64)
+
+        # (start, count) of every probed voxel in the voxel-sorted point order
+        probe = pack_cells((cells[:, None, :] + offsets).reshape(-1, 3))
+        starts = np.zeros(probe.shape, dtype=np.int64)
+        counts = np.zeros(probe.shape, dtype=np.int64)
+        if self.keys.size:
+            pos = np.minimum(np.searchsorted(self.keys, probe), self.keys.size - 1)
+            hit = self.keys[pos] == probe
+            starts[hit] = self.starts[pos[hit]]
+            counts[hit] = self.counts[pos[hit]]
+
+        # Gather candidates in chunks of whole queries so memory stays bounded
+        cum = np.cumsum(counts.reshape(n, n_off).sum(axis=1))
+        a = 0
+        while a < n:
+            done = cum[a - 1] if a else 0
+            b = max(a + 1, int(np.searchsorted(cum, done + self.max_candidates, side='right')))
+            c = counts[a * n_off:b * n_off]
+            total = c.sum()
+            if total:
+                qid = np.repeat(np.repeat(np.arange(a, b), n_off), c)
+                pos = np.repeat(starts[a * n_off:b * n_off] - (np.cumsum(c) - c), c) + np.arange(total)
+                cand = self.order[pos]
+                diff = self.xyz[cand] - pts[qid]
+                # same accumulation order as cKDTree, so equal geometry gives equal distances
+                d = np.sqrt(diff[:, 0] ** 2 + diff[:, 1] ** 2 + diff[:, 2] ** 2)
+
+                if k == 1:
+                    # qid is already grouped, so a segmented min avoids sorting
+                    first = np.flatnonzero(np.r_[True, qid[1:] != qid[:-1]])
+                    d_min = np.minimum.reduceat(d, first)
+                    at_min = d == np.repeat(d_min, np.diff(np.r_[first, d.size]))
+                    dist[qid[first], 0] = d_min
+                    idx[qid[first], 0] = np.minimum.reduceat(np.where(at_min, cand, self.xyz.shape[0]), first)
+                else:
+                    order = np.lexsort((cand, d, qid))
+                    qid, cand, d = qid[order], cand[order], d[order]
+                    rank = np.arange(qid.size) - np.searchsorted(qid, qid)
+                    keep = rank < k
+                    dist[qid[keep], rank[keep]] = d[keep]
+                    idx[qid[keep], rank[keep]] = cand[keep]
+            a = b
+        return dist, idx
+
+
+BACKENDS = {
+    'kdtree': KDTreeIndex,
+    'open3d': Open3DIndex,
+    'voxel': VoxelHashIndex,
+}
+
+
+def build_index(xyz: np.ndarray, backend: str = 'kdtree', voxel_size: float = None):
+    """Build a neighbour index over `xyz` (N x 3) with the named backend.
+
+    `voxel_size` (metres) is only used by the 'voxel' backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown neighbour backend '{backend}', expected one of {sorted(BACKENDS)}")
+    if backend == 'voxel':
+        return VoxelHashIndex(xyz, voxel_size)
+    return BACKENDS[backend](xyz)
+
+
+# ─── exact grid join ───────────────────────────────────────────────────────────
+# Geometry that sits on the 1 mm quantization grid (lossless round trips, or the
+# pre-quantized PLYs after reverse_quantize) does not need a tree at all: pack the
+# integer grid cell of every point into one int64 key and join on it.
+
+GRID_STEP = 0.001
+KEY_BITS = 21                        # bits per axis, +-1048 m at 1 mm
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+MATCH_MODES = ('exact', 'nn', 'auto')
+
+
+def grid_cells(xyz: np.ndarray, step: float = GRID_STEP) -> np.ndarray:
+    """Integer grid cell of every point (same rounding as `quantize`, without the offset)."""
+    return np.round(xyz / step).astype(np.int64)
+
+
+def pack_cells(cells: np.ndarray) -> np.ndarray:
+    """Pack (N, 3) integer cells into one int64 key per point."""
+    shifted = np.asarray(cells, dtype=np.int64) + KEY_OFFSET
+    if shifted.size and (shifted.min() < 0 or shifted.max() >= (1 << KEY_BITS)):
+        raise ValueError(f"Grid cells out of the packable range (+-{KEY_OFFSET} cells per axis)")
+    return (shifted[:, 0] << (2 * KEY_BITS)) | (shifted[:, 1] << KEY_BITS) | shifted[:, 2]
+
+
+class GridHashIndex:
+    """Sorted int64 keys of the original points, one representative per cell.
+
+    When several original points share a cell the one closest to the grid point
+    wins (ties: lowest index), i.e. the point `quantize` would map onto it most
+    faithfully.
+    """
+
+    def __init__(self, xyz: np.ndarray, step: float = GRID_STEP):
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.step = step
+        cells = grid_cells(np.asarray(xyz), step)
+        keys = pack_cells(cells)
+        off_grid = np.linalg.norm(self.xyz - cells * step, axis=1)
+        order = np.lexsort((np.arange(keys.size), off_grid, keys))
+        sorted_keys = keys[order]
+        first = np.ones(sorted_keys.size, dtype=bool)
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        self.keys = sorted_keys[first]
+        self.rep = order[first]
+
+    def cache_state(self):
+        return {'step': np.asarray(self.step), 'keys': self.keys, 'rep': self.rep}
+
+    @classmethod
+    def from_cache_state(cls, xyz, state):
+        self = cls.__new__(cls)
+        self.xyz = np.asarray(xyz, dtype=np.float64)
+        self.step = float(state['step'])
+        self.keys, self.rep = state['keys'], state['rep']
+        return self
+
+    def lookup(self, cells: np.ndarray) -> np.ndarray:
+        """Original index for every query cell, -1 where the cell holds no original point."""
+        keys = pack_cells(cells)
+        if self.keys.size == 0:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), self.keys.size - 1)
+        return np.where(self.keys[pos] == keys, self.rep[pos], -1)
+
+
+class ScanMatcher:
+    """Matches decompressed points against one original scan.
+
+    The KD-tree / grid index over the original xyz is built on first use and
+    kept, so one scan can serve several decompressed versions (e.g. every Q
+    level) for the price of a single build.
+
+    match_mode:
+      nn    - nearest neighbour through `backend`
+      exact - grid join; only points whose key misses fall back to NN
+      auto  - grid join if every point matches, otherwise NN for the whole file
+    """
+
+    def __init__(self, xyz_orig: np.ndarray, backend: str = 'kdtree', workers: int = 1,
+                 cache=None, scan_key: str = None):
+        self.xyz_orig = xyz_orig
+        self.backend = backend
+        self.workers = workers
+        # optional goosekit.index_cache.IndexCache + content key of the original scan
+        self.cache = cache if scan_key is not None else None
+        self.scan_key = scan_key
+        self._indexes = {}
+        self._grid = None
+
+    def index(self, voxel_size: float = None):
+        # only the voxel backend depends on the voxel size (one index per Q level)
+        key = voxel_size if self.backend == 'voxel' else None
+        if key not in self._indexes:
+            cls = BACKENDS.get(self.backend)
+            if self.cache is not None and hasattr(cls, 'from_cache_state'):
+                params = {'voxel_size': voxel_size} if self.backend == 'voxel' else {}
+                self._indexes[key] = self.cache.get_or_build(
+                    self.scan_key, self.backend, cls, self.xyz_orig,
+                    lambda: build_index(self.xyz_orig, self.backend, voxel_size=voxel_size), **params)
+            else:
+                self._indexes[key] = build_index(self.xyz_orig, self.backend, voxel_size=voxel_size)
+        return self._indexes[key]
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            if self.cache is not None:
+                self._grid = self.cache.get_or_build(self.scan_key, 'grid', GridHashIndex, self.xyz_orig,
+                                                     lambda: GridHashIndex(self.xyz_orig))
+            else:
+                self._grid = GridHashIndex(self.xyz_orig)
+        return self._grid
+
+    def _nn(self, pts, voxel_size):
+        dist, idx = self.index(voxel_size).query(pts, k=1, workers=self.workers)
+        return dist[:, 0], idx[:, 0]
+
+    def knn(self, xyz_dec: np.ndarray, k: int, voxel_size: float = None):
+        """(dist, idx), both (N, k), of the k nearest original points, nearest first."""
+        return self.index(voxel_size).query(xyz_dec, k=k, workers=self.workers)
+
+    def match(self, xyz_dec: np.ndarray, match_mode: str = 'nn', dec_cells: np.ndarray = None,
+              voxel_size: float = None):
+        """Return (dist, idx), both (N,), of the original point matched to each point.
+
+        Without `dec_cells` the join is a lossless one: a decompressed point only
+        matches if it has exactly the coordinates of the cell's original point.
+        Pass `dec_cells` (integer cells, e.g. the quantized PLY coords minus the
+        131072 offset) when the decompressed points are grid points themselves.
+        `voxel_size` is the decompressed grid spacing used by the 'voxel' backend.
+        """
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{match_mode}', expected one of {MATCH_MODES}")
+        if match_mode == 'nn':
+            return self._nn(xyz_dec, voxel_size)
+
+        grid = self.grid
+        if dec_cells is None:
+            idx = grid.lookup(grid_cells(xyz_dec))
+            hit = idx >= 0
+            hit[hit] = np.all(np.asarray(self.xyz_orig)[idx[hit]] == xyz_dec[hit], axis=1)
+            idx[~hit] = -1
+        else:
+            idx = grid.lookup(dec_cells)
+            hit = idx >= 0
+
+        if match_mode == 'auto' and not hit.all():
+            return self._nn(xyz_dec, voxel_size)
+
+        dist = np.empty(idx.shape, dtype=np.float64)
+        dist[hit] = np.linalg.norm(np.asarray(xyz_dec, dtype=np.float64)[hit] - grid.xyz[idx[hit]], axis=1)
+        if not hit.all():
+            dist[~hit], idx[~hit] = self._nn(xyz_dec[~hit], voxel_size)
+        return dist, idx
+
+
+def match_nearest(xyz_orig: np.ndarray, xyz_dec: np.ndarray, match_mode: str = 'nn',
+                  backend: str = 'kdtree', workers: int = 1, dec_cells: np.ndarray = None,
+                  voxel_size: float = None):
+    """One-shot `ScanMatcher(xyz_orig, backend, workers).match(...)`."""
+    return ScanMatcher(xyz_orig, backend, workers).match(xyz_dec, match_mode, dec_cells, voxel_size)
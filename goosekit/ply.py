@@ -0,0 +1,195 @@
+import numpy as np
+
+'''
+Header-aware PLY reading without Open3D.
+
+The header is parsed for the format, the elements and their properties; the
+vertex body is then read in one call:
+  ascii                - one split of the whole body converted by one np.array call
+                         (no per-line Python loop)
+  binary_little_endian - np.fromfile from the vertex offset with a structured dtype,
+  binary_big_endian      returned without a copy when x y z are the only (float) properties
+'''
+
+# PLY scalar type -> numpy dtype character code
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+PLY_FORMATS = {'ascii': None, 'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+
+class PlyHeader:
+    """Parsed PLY header: `format`, `elements` [(name, count, [(prop, ply_type)])] and
+    `body_offset` (byte offset of the first element's data)."""
+
+    def __init__(self, fmt: str, elements: list, body_offset: int):
+        self.format = fmt
+        self.elements = elements
+        self.body_offset = body_offset
+
+    def element(self, name: str):
+        for el_name, count, props in self.elements:
+            if el_name == name:
+                return count, props
+        raise ValueError(f"PLY has no '{name}' element")
+
+    def vertex_count(self) -> int:
+        return self.element('vertex')[0]
+
+    def to_dict(self) -> dict:
+        return {'format': self.format, 'elements': [[n, c, [list(p) for p in props]] for n, c, props in self.elements],
+                'body_offset': self.body_offset}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'PlyHeader':
+        return cls(d['format'], [(n, c, [tuple(p) for p in props]) for n, c, props in d['elements']], d['body_offset'])
+
+    def dtype(self, name: str = 'vertex') -> np.dtype:
+        """Structured dtype of one `name` record in the binary body."""
+        _, props = self.element(name)
+        order = PLY_FORMATS[self.format] or '<'
+        return np.dtype([(prop, order + PLY_TYPES[ptype]) for prop, ptype in props])
+
+
+def parse_ply_header(buf: bytes, path='<buffer>') -> PlyHeader:
+    """Parse the header at the start of `buf` (which only needs to hold the header)."""
+    end = buf.find(b'end_header')
+    if not buf.startswith(b'ply') or end < 0:
+        raise ValueError(f"{path} is not a PLY file (or its header is truncated)")
+    body_offset = buf.index(b'\n', end) + 1
+
+    fmt = None
+    elements = []
+    for line in buf[:end].decode('ascii', errors='replace').splitlines()[1:]:
+        words = line.split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'format':
+            fmt = words[1]
+            if fmt not in PLY_FORMATS:
+                raise ValueError(f"Unsupported PLY format '{fmt}' in {path}")
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            if not elements:
+                raise ValueError(f"PLY property before any element in {path}")
+            if words[1] == 'list':
+                # variable-size records: kept as a marker, only allowed after the vertex data
+                elements[-1][2].append((words[-1], 'list'))
+            elif words[1] in PLY_TYPES:
+                elements[-1][2].append((words[2], words[1]))
+            else:
+                raise ValueError(f"Unknown PLY property type '{words[1]}' in {path}")
+    if fmt is None:
+        raise ValueError(f"PLY header without format line in {path}")
+    return PlyHeader(fmt, elements, body_offset)
+
+
+def read_ply_header(path) -> PlyHeader:
+    with open(path, 'rb') as f:
+        buf = f.read(4096)
+        while b'end_header' not in buf:
+            more = f.read(4096)
+            if not more:
+                break
+            buf += more
+    return parse_ply_header(buf, path)
+
+
+def _vertex_start(header: PlyHeader, path):
+    """(elements before 'vertex') must be fixed-size so the vertex data can be located."""
+    skip_records = []
+    for name, count, props in header.elements:
+        if name == 'vertex':
+            if any(ptype == 'list' for _, ptype in props):
+                raise ValueError(f"List properties on the vertex element are not supported ({path})")
+            return skip_records
+        if count and any(ptype == 'list' for _, ptype in props):
+            raise ValueError(f"Variable-size element '{name}' before the vertices is not supported ({path})")
+        skip_records.append((name, count))
+    raise ValueError(f"PLY has no 'vertex' element ({path})")
+
+
+def read_ply(path, fields=('x', 'y', 'z'), header: PlyHeader = None) -> np.ndarray:
+    """Vertex properties `fields` of a PLY as a float32 (N, len(fields)) array.
+
+    `header` may be passed from a header scan (goosekit.ply_index) to skip
+    re-parsing it. Binary bodies are read straight from the vertex offset into
+    an array of the declared size; when the vertex records are exactly the
+    float32 `fields` that array is returned as is (no copy).
+    """
+    if header is None:
+        header = read_ply_header(path)
+    skip = _vertex_start(header, path)
+    n, props = header.element('vertex')
+    names = [prop for prop, _ in props]
+    missing = [fld for fld in fields if fld not in names]
+    if missing:
+        raise ValueError(f"PLY vertex element of {path} has no {missing} properties (has {names})")
+
+    if header.format == 'ascii':
+        with open(path, 'rb') as f:
+            f.seek(header.body_offset)
+            buf = f.read()
+        offset = 0
+        for _ in range(sum(count for _, count in skip)):
+            offset = buf.index(b'\n', offset) + 1
+        # whole body in one parse; rows of elements after the vertices are sliced off
+        values = np.array(buf[offset:].split(), dtype=np.float64)
+        if values.size < n * len(names):
+            raise ValueError(f"PLY {path} declares {n} vertices but its body holds {values.size // len(names)}")
+        values = values[:n * len(names)].reshape(n, len(names))
+        return values[:, [names.index(fld) for fld in fields]].astype(np.float32)
+
+    offset = header.body_offset + sum(header.dtype(name).itemsize * count for name, count in skip)
+    dtype = header.dtype('vertex')
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        records = np.fromfile(f, dtype=dtype, count=n)
+    if records.shape[0] < n:
+        raise ValueError(f"PLY {path} declares {n} vertices but its body is truncated")
+    if names == list(fields) and all(dtype[fld] == np.dtype('<f4') for fld in fields):
+        # records are exactly the wanted float32 fields: reinterpret in place
+        return records.view('<f4').reshape(n, len(fields))
+    return np.stack([records[fld] for fld in fields], axis=1).astype(np.float32)
+
+
+# 9 significant digits round-trip every float32 exactly (and print integers as integers)
+ASCII_FLOAT_FMT = '%.9g'
+
+
+def ply_header(n: int, fmt: str = 'ascii', fields=('x', 'y', 'z'), ply_type: str = 'float') -> bytes:
+    lines = ['ply', f'format {fmt} 1.0', f'element vertex {n}']
+    lines += [f'property {ply_type} {fld}' for fld in fields]
+    lines.append('end_header\n')
+    return '\n'.join(lines).encode('ascii')
+
+
+def ascii_rows(points: np.ndarray) -> bytes:
+    """ASCII PLY body lines of float32 (N, C) `points`, formatted by a single %-operation."""
+    row_fmt = ' '.join([ASCII_FLOAT_FMT] * points.shape[1]) + '\n'
+    return ((row_fmt * points.shape[0]) % tuple(points.ravel().tolist())).encode('ascii')
+
+
+def write_ply_ascii(path, points: np.ndarray, fields=('x', 'y', 'z'), chunk_rows: int = 1 << 18):
+    """Write float32 (N, len(fields)) `points` as an ASCII PLY.
+
+    Each chunk of rows is formatted by a single %-operation over the flat value
+    list and written with one call, instead of one f-string + write per vertex.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, len(fields))
+    with open(path, 'wb') as f:
+        f.write(ply_header(points.shape[0], 'ascii', fields))
+        for start in range(0, points.shape[0], chunk_rows):
+            f.write(ascii_rows(points[start:start + chunk_rows]))
+
+
+def write_ply_binary(path, points: np.ndarray, fields=('x', 'y', 'z')):
+    """Write float32 (N, len(fields)) `points` as a binary_little_endian PLY (raw bytes, lossless)."""
+    points = np.ascontiguousarray(points, dtype='<f4').reshape(-1, len(fields))
+    with open(path, 'wb') as f:
+        f.write(ply_header(points.shape[0], 'binary_little_endian', fields))
+        f.write(points.tobytes())
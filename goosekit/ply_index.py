@@ -0,0 +1,59 @@
+import os
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from goosekit.manifest import walk_files
+from goosekit.ply import PlyHeader, read_ply_header
+
+'''
+Header-only index of the PLYs under a root: format, elements / properties,
+vertex count and body offset of every file, without reading any point data.
+
+Headers are read by a thread pool (the work is small reads, so threads overlap
+the filesystem latency) and cached in <root>/ply_index.json keyed by relative
+path; a cached header is reused while the file's size and mtime are unchanged.
+The headers can be handed to read_ply(path, header=...) so readers seek straight
+to the body and know the array size up front.
+'''
+
+PLY_INDEX_NAME = 'ply_index.json'
+
+
+def _load_index(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_index(path: Path, entries: dict):
+    tmp = path.with_name(f'.{path.name}.tmp-{os.getpid()}')
+    with open(tmp, 'w') as f:
+        json.dump(entries, f)
+    tmp.replace(path)
+
+
+def scan_ply_headers(root, pattern: str = '*.ply', threads: int = 16, cache: bool = True) -> dict:
+    """{rel: PlyHeader} for every PLY under root; cached in <root>/ply_index.json when `cache`."""
+    root = Path(root)
+    index_path = root / PLY_INDEX_NAME
+    cached = _load_index(index_path) if cache else {}
+
+    entries, todo = {}, []
+    for rel, size, mtime_ns in walk_files(root, pattern):
+        key = rel.as_posix()
+        old = cached.get(key)
+        if old is not None and old['bytes'] == size and old['mtime_ns'] == mtime_ns:
+            entries[key] = old
+        else:
+            todo.append((key, size, mtime_ns))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        headers = pool.map(lambda key: read_ply_header(root / key), [key for key, _, _ in todo])
+        for (key, size, mtime_ns), header in zip(todo, headers):
+            entries[key] = {'bytes': size, 'mtime_ns': mtime_ns, **header.to_dict()}
+
+    if cache and (todo or len(entries) != len(cached)):
+        _save_index(index_path, entries)
+    return {Path(key): PlyHeader.from_dict(e) for key, e in sorted(entries.items())}
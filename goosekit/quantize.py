@@ -0,0 +1,84 @@
+import numpy as np
+
+from goosekit.neighbors import KEY_BITS, KEY_OFFSET, grid_cells, pack_cells
+
+'''
+The fixed 18 bit (1 mm) quantization of the quantized PLY datasets:
+    coords_q = round(orig / 0.001) + 131072
+'''
+
+QUANT_STEP = 0.001
+QUANT_OFFSET = 131072
+
+
+def quantize(coords: np.ndarray) -> np.ndarray:
+    '''quantize point cloud coords to 18 bit (1mm) precision'''
+    if not isinstance(coords, np.ndarray):
+        # iterable of (n, 3) chunks, e.g. goosekit.stream.iter_bin_chunks(...)
+        return keys_to_quantized(quantize_chunks(chunk[:, :3] for chunk in coords))
+    # scale to 1mm, offset to avoid negatives, deduplicate
+    coords = np.round(coords / QUANT_STEP) + QUANT_OFFSET
+    coords = np.unique(coords, axis=0)
+    return coords
+
+
+def reverse_quantize(coords_q: np.ndarray) -> np.ndarray:
+    """
+    Reverse 18‑bit (1 mm) quantization:
+      coords_q = round(orig/0.001) + 131072
+    ⇒ orig = (coords_q - 131072) * 0.001
+    """
+    return (coords_q - float(QUANT_OFFSET)) * QUANT_STEP
+
+
+# Points are deduplicated chunk by chunk on the packed grid keys of goosekit.neighbors
+# (21 bits per axis, +-1048 m), which sort in the same (x, y, z) order as np.unique(axis=0).
+
+def quantize_keys(coords: np.ndarray) -> np.ndarray:
+    """Packed int64 grid keys of the quantized coords (not deduplicated)."""
+    return pack_cells(grid_cells(coords, QUANT_STEP))
+
+
+def keys_to_quantized(keys: np.ndarray) -> np.ndarray:
+    """(N, 3) quantized coords (as quantize() returns them) of packed keys."""
+    mask = (1 << KEY_BITS) - 1
+    cells = np.stack([keys >> 2 * KEY_BITS, (keys >> KEY_BITS) & mask, keys & mask], axis=1)
+    return (cells - KEY_OFFSET + QUANT_OFFSET).astype(np.float64)
+
+
+class QuantizedKeySet:
+    """Sorted unique packed keys of the quantized points of every chunk add()-ed.
+
+    Only the deduplicated keys (8 bytes per output point) are held, so
+    keys_to_quantized(keys()) equals quantize() of the concatenated chunks
+    without the chunks ever being in memory together.
+    """
+
+    def __init__(self):
+        self._keys = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._n_pending = 0
+
+    def add(self, coords: np.ndarray):
+        self._pending.append(np.unique(quantize_keys(coords)))
+        self._n_pending += self._pending[-1].size
+        # merge once the pending runs are as large as the merged set (amortized n log n)
+        if self._n_pending >= self._keys.size:
+            self._merge()
+
+    def _merge(self):
+        self._keys = np.unique(np.concatenate([self._keys] + self._pending))
+        self._pending, self._n_pending = [], 0
+
+    def keys(self) -> np.ndarray:
+        if self._pending:
+            self._merge()
+        return self._keys
+
+
+def quantize_chunks(chunks) -> np.ndarray:
+    """quantize() over an iterable of (n, 3) coordinate chunks, as sorted unique packed keys."""
+    key_set = QuantizedKeySet()
+    for chunk in chunks:
+        key_set.add(chunk)
+    return key_set.keys()
@@ -0,0 +1,101 @@
+from pathlib import Path
+import numpy as np
+
+'''
+Per-file NN distance statistics and the --threshold policy of the restoration
+scripts.
+
+Instead of raising on the first point farther than --threshold from every
+original point (which killed the whole Pool run), each file gets one row of
+distance statistics and the policy decides what happens to the far points:
+  fail        - the file is not written; the run continues and exits non-zero at the end
+  warn        - the file is written unchanged
+  drop_points - the far points are left out of the output
+The rows are collected by the parent process into a sidecar CSV / parquet report.
+'''
+
+THRESHOLD_POLICIES = ('fail', 'warn', 'drop_points')
+REPORT_NAME = 'threshold_report.csv'
+
+
+def threshold_check(src: Path, out: Path, dists: np.ndarray, threshold, policy: str = 'fail'):
+    """Distance statistics of one file and the points to keep under `policy`.
+
+    `threshold` None means the check is off (statistics only). Returns (row, keep)
+    where keep is None to write every point, or a boolean mask of the points to
+    write (drop_points); row['status'] == 'failed' means the file must not be written.
+    """
+    if policy not in THRESHOLD_POLICIES:
+        raise ValueError(f"Unknown threshold policy '{policy}', expected one of {THRESHOLD_POLICIES}")
+    dists = np.asarray(dists, dtype=np.float64)
+    row = {
+        'src': str(src),
+        'out': str(out),
+        'n_points': int(dists.size),
+        'dist_max': float(dists.max()) if dists.size else 0.0,
+        'dist_p99': float(np.percentile(dists, 99)) if dists.size else 0.0,
+        'dist_mean': float(dists.mean()) if dists.size else 0.0,
+        'threshold': threshold,
+        'n_over': None,
+        'status': 'unchecked',
+    }
+    if threshold is None:
+        return row, None
+
+    over = dists > threshold
+    row['n_over'] = int(np.count_nonzero(over))
+    if not row['n_over']:
+        row['status'] = 'ok'
+        return row, None
+    if policy == 'fail':
+        idx = int(np.argmax(over))
+        print(f"No original point within {threshold} for {src} point index {idx} (dist={dists[idx]}), not written")
+        row['status'] = 'failed'
+        return row, None
+    if policy == 'warn':
+        print(f"Warning: {row['n_over']} points of {src} farther than {threshold} (max {row['dist_max']})")
+        row['status'] = 'warned'
+        return row, None
+    row['status'] = 'dropped'
+    return row, ~over
+
+
+def write_report(rows, path: Path):
+    """Write report rows to `path` (.parquet or .csv), replacing rows of the same files from earlier runs."""
+    path = Path(path)
+    # pandas is only needed by the parent writing the report, not in the pool workers
+    import pandas as pd
+    df = pd.DataFrame(rows, columns=['src', 'out', 'n_points', 'dist_max', 'dist_p99', 'dist_mean',
+                                     'threshold', 'n_over', 'status'])
+    if path.exists():
+        old = pd.read_parquet(path) if path.suffix == '.parquet' else pd.read_csv(path)
+        df = pd.concat([old[~old['src'].isin(df['src'])], df], ignore_index=True)
+    df = df.sort_values('src', ignore_index=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return df
+
+
+def write_reports(rows, report: str, out_roots):
+    """Write one report to `report`, or (report None) one REPORT_NAME per output root.
+
+    Returns the number of failed files.
+    """
+    if report:
+        write_report(rows, Path(report))
+    else:
+        for root in out_roots:
+            root_rows = [r for r in rows if Path(r['out']).is_relative_to(root)]
+            if root_rows:
+                write_report(root_rows, Path(root) / REPORT_NAME)
+    return sum(r['status'] == 'failed' for r in rows)
+
+
+def finish_reports(rows, report: str, out_roots):
+    """write_reports(), then end the run non-zero if the fail policy left files unwritten."""
+    n_failed = write_reports(rows, report, out_roots)
+    if n_failed:
+        raise SystemExit(f"{n_failed} file(s) had points beyond --threshold and were not written (see report)")
@@ -0,0 +1,357 @@
+import os
+import re
+import json
+import mmap
+import struct
+import fnmatch
+import hashlib
+import functools
+from pathlib import Path
+import numpy as np
+
+from goosekit.binio import map_bin, scan_view
+from goosekit.manifest import current_manifest, list_files, point_count
+
+'''
+Packed shard container for the per-scan files of the Goose datasets.
+
+A shard holds many files (original .bin scans, .label files, restored bins,
+PLYs, ...) back to back, so one sequence (or N scans) is one file on the scratch
+filesystem instead of thousands:
+
+    b'GOOSHRD1'
+    blob 0, blob 1, ...              raw file bytes, each aligned to 64 bytes
+    index                            JSON {"entries": [[rel, offset, length], ...]}
+    <Q index offset> <Q index length> b'GOOSHRD1'
+
+The relative path of every member is kept, so a shard directory can stand in for
+the directory tree it was packed from: `open_store(root)` returns a ShardStore
+for a directory of *.shard files and a DirStore otherwise, both with the same
+files() / exists() / read_bytes() / array() / read_bin_xyz[_intensity]()
+interface. Reading a member is a slice of the shard's memory map (no copy).
+
+Scripts writing one output file per scan can pack their outputs the same way as
+they go with a ShardPacker (--shard_outputs).
+'''
+
+SHARD_MAGIC = b'GOOSHRD1'
+SHARD_SUFFIX = '.shard'
+_FOOTER = struct.Struct('<QQ8s')
+_ALIGN = 64
+
+# Goose scan names are <sequence>_<frame>_<timestamp>_<sensor>
+_SCAN_NAME = re.compile(r'^(?P<sequence>.+?)_+\d+_\d+_[A-Za-z0-9]+$')
+
+
+def sequence_of(rel: Path) -> str:
+    """Sequence a scan belongs to, e.g. '2023-04-20_campus' (the file stem if the name does not parse)."""
+    m = _SCAN_NAME.match(rel.stem)
+    return m.group('sequence') if m else rel.stem
+
+
+class ShardWriter:
+    """Write one shard; members are added with add() / add_file() and indexed on close()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(f'.{self.path.name}.tmp-{os.getpid()}')
+        self._f = open(self._tmp, 'wb')
+        self._f.write(SHARD_MAGIC)
+        self._entries = []
+        self._names = set()
+
+    def add(self, rel, data):
+        """Add `data` (bytes or a numpy array, stored as its raw C-order bytes) as member `rel`."""
+        rel = Path(rel).as_posix()
+        if rel in self._names:
+            raise ValueError(f"Duplicate shard member {rel} in {self.path}")
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data).tobytes()
+        pad = -self._f.tell() % _ALIGN
+        self._f.write(b'\0' * pad)
+        offset = self._f.tell()
+        self._f.write(data)
+        self._entries.append((rel, offset, len(data)))
+        self._names.add(rel)
+
+    def add_file(self, rel, path):
+        with open(path, 'rb') as f:
+            self.add(rel, f.read())
+
+    def close(self):
+        if self._f is None:
+            return
+        index = json.dumps({'entries': self._entries}).encode()
+        offset = self._f.tell()
+        self._f.write(index)
+        self._f.write(_FOOTER.pack(offset, len(index), SHARD_MAGIC))
+        self._f.close()
+        self._f = None
+        self._tmp.replace(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            self._tmp.unlink(missing_ok=True)
+
+
+def read_shard_index(path):
+    """[(rel, offset, length)] of a shard, read from its footer without mapping the file."""
+    with open(path, 'rb') as f:
+        f.seek(-_FOOTER.size, os.SEEK_END)
+        offset, length, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != SHARD_MAGIC:
+            raise ValueError(f"{path} is not a Goose shard")
+        f.seek(offset)
+        return [tuple(e) for e in json.loads(f.read(length))['entries']]
+
+
+class ShardReader:
+    """Memory-mapped shard; members are returned as zero-copy slices of the map."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index = {rel: (offset, length) for rel, offset, length in read_shard_index(self.path)}
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, rel):
+        return Path(rel).as_posix() in self.index
+
+    def read_bytes(self, rel) -> memoryview:
+        offset, length = self.index[Path(rel).as_posix()]
+        return memoryview(self._mm)[offset:offset + length]
+
+    def array(self, rel, dtype) -> np.ndarray:
+        offset, length = self.index[Path(rel).as_posix()]
+        dtype = np.dtype(dtype)
+        if length % dtype.itemsize:
+            raise ValueError(f"Shard member {rel} of {self.path}: {length} bytes is not a multiple of {dtype}")
+        return np.frombuffer(self._mm, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+
+class DirStore:
+    """A plain directory tree behind the store interface."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def files(self, pattern: str = '*'):
+        # from the root's manifest.parquet if it has one
+        return list_files(self.root, pattern)
+
+    def exists(self, rel) -> bool:
+        return (self.root / rel).exists()
+
+    def read_bytes(self, rel):
+        return (self.root / rel).read_bytes()
+
+    def array(self, rel, dtype) -> np.ndarray:
+        return np.fromfile(str(self.root / rel), dtype=dtype)
+
+    def read_bin_xyz(self, rel):
+        return map_bin(self.root / rel)[:, :3]
+
+    def read_bin_xyz_intensity(self, rel):
+        pts = map_bin(self.root / rel)
+        return pts[:, :3], pts[:, 3]
+
+    def digest(self, rel) -> str:
+        from goosekit.index_cache import file_digest
+        return file_digest(self.root / rel)
+
+
+class ShardStore(DirStore):
+    """A directory of shards read as if it were the tree they were packed from."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.shard_paths = sorted(self.root.rglob('*' + SHARD_SUFFIX))
+        # rel -> shard path (footers only; shards are mapped on first use)
+        self._where = {}
+        for shard in self.shard_paths:
+            for rel, _, _ in read_shard_index(shard):
+                self._where[rel] = shard
+        self._readers = {}
+
+    def _reader(self, rel) -> ShardReader:
+        shard = self._where.get(Path(rel).as_posix())
+        if shard is None:
+            raise FileNotFoundError(f"{rel} is not in any shard under {self.root}")
+        if shard not in self._readers:
+            self._readers[shard] = ShardReader(shard)
+        return self._readers[shard]
+
+    def files(self, pattern: str = '*'):
+        # same matching as rglob(pattern): on the file name
+        return sorted(Path(rel) for rel in self._where if fnmatch.fnmatch(rel.rsplit('/', 1)[-1], pattern))
+
+    def exists(self, rel) -> bool:
+        return Path(rel).as_posix() in self._where
+
+    def read_bytes(self, rel):
+        return self._reader(rel).read_bytes(rel)
+
+    def array(self, rel, dtype) -> np.ndarray:
+        return self._reader(rel).array(rel, dtype)
+
+    def read_bin_xyz(self, rel):
+        return scan_view(self.array(rel, '<f4'), rel)[:, :3]
+
+    def read_bin_xyz_intensity(self, rel):
+        pts = scan_view(self.array(rel, '<f4'), rel)
+        return pts[:, :3], pts[:, 3]
+
+    def digest(self, rel) -> str:
+        # same digest as file_digest() of the unpacked file
+        return hashlib.blake2b(self.read_bytes(rel), digest_size=16).hexdigest()
+
+
+def is_shard_root(root) -> bool:
+    root = Path(root)
+    return root.is_dir() and next(root.rglob('*' + SHARD_SUFFIX), None) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def open_store(root):
+    """ShardStore if `root` holds *.shard files, else DirStore (one per process and root)."""
+    return ShardStore(root) if is_shard_root(root) else DirStore(root)
+
+
+def _split(rels, sizes, scans_per_shard: int, points_per_shard: int):
+    """Consecutive chunks of `rels` with at most `scans_per_shard` files and `points_per_shard` points (0: no limit)."""
+    chunks, chunk, points = [], [], 0
+    for rel in rels:
+        n = max(sizes.get(rel, 0), 0)
+        full = (scans_per_shard > 0 and len(chunk) >= scans_per_shard) or \
+               (points_per_shard > 0 and chunk and points + n > points_per_shard)
+        if full:
+            chunks.append(chunk)
+            chunk, points = [], 0
+        chunk.append(rel)
+        points += n
+    return chunks + [chunk] if chunk else chunks
+
+
+def shard_groups(src_root, pattern: str = '*', scans_per_shard: int = 0, points_per_shard: int = 0):
+    """[(shard rel path, [member rel paths])] for packing the files matching `pattern` under src_root.
+
+    One shard per directory and sequence (<dir>/<sequence>.shard), split into
+    <sequence>-<k>.shard chunks of at most `scans_per_shard` files / `points_per_shard`
+    points when those are > 0. Point counts come from the root's manifest if it is current.
+    """
+    src_root = Path(src_root)
+    groups = {}
+    for rel in list_files(src_root, pattern):
+        groups.setdefault((rel.parent, sequence_of(rel)), []).append(rel)
+
+    sizes = {}
+    if points_per_shard > 0:
+        manifest = current_manifest(src_root)
+        if manifest is not None:
+            sizes = {Path(rel): n for rel, n in zip(manifest['rel_path'], manifest['n_points'])}
+        else:
+            sizes = {rel: point_count(src_root / rel, (src_root / rel).stat().st_size)
+                     for rels in groups.values() for rel in rels}
+
+    shards = []
+    for (parent, sequence), rels in sorted(groups.items()):
+        if scans_per_shard <= 0 and points_per_shard <= 0:
+            shards.append((parent / (sequence + SHARD_SUFFIX), rels))
+            continue
+        for k, chunk in enumerate(_split(rels, sizes, scans_per_shard, points_per_shard)):
+            shards.append((parent / f'{sequence}-{k:05d}{SHARD_SUFFIX}', chunk))
+    return shards
+
+
+def write_shard(shard_path, src_root, rels):
+    """Pack the files src_root/<rel> into one shard."""
+    with ShardWriter(shard_path) as writer:
+        for rel in rels:
+            writer.add_file(rel, Path(src_root) / rel)
+    return shard_path
+
+
+def free_shard_path(parent: Path, sequence: str) -> Path:
+    """<parent>/<sequence>.shard, or the first <sequence>-<k>.shard not taken yet."""
+    path = parent / (sequence + SHARD_SUFFIX)
+    k = 0
+    while path.exists():
+        path = parent / f'{sequence}-{k:05d}{SHARD_SUFFIX}'
+        k += 1
+    return path
+
+
+class ShardPacker:
+    """
+    Packs the output files of a run into shards while it goes, so every output
+    root ends up with one <dir>/<sequence>.shard per directory and sequence
+    instead of one file per scan. The workers still write plain files; add()
+    registers the outputs of each scan's task, and once finished() has been
+    called for every scan of a group, the group's files are packed and removed
+    (a group that gets more outputs later goes into <sequence>-<k>.shard).
+    Outputs already packed by an earlier run are left out by add().
+    """
+
+    def __init__(self, roots):
+        self.roots = [Path(r) for r in roots]
+        self.packed = {root: {rel.as_posix() for rel in ShardStore(root).files()} if is_shard_root(root) else set()
+                       for root in self.roots}
+        self.outputs = {}
+        # (root, dir, sequence) -> scans not finished yet / output paths of the finished ones
+        self._pending, self._members = {}, {}
+
+    def add(self, rel, items, paths_of=lambda item: [item]):
+        """Register the items of scan `rel` (e.g. its Q levels) whose outputs paths_of(item) are not all packed yet; returns them."""
+        todo = [item for item in items if not all(self.done(p) for p in paths_of(item))]
+        paths = [Path(p) for item in todo for p in paths_of(item)]
+        self.outputs.setdefault(rel, []).extend(paths)
+        for path in paths:
+            self._pending.setdefault(self._group(rel, path), set()).add(rel)
+        return todo
+
+    def _root_rel(self, path: Path):
+        for root in self.roots:
+            if path.is_relative_to(root):
+                return root, path.relative_to(root)
+        raise ValueError(f"{path} is not under any of the output roots {self.roots}")
+
+    def _group(self, rel, path):
+        root, out_rel = self._root_rel(path)
+        return root, out_rel.parent, sequence_of(Path(rel))
+
+    def done(self, path) -> bool:
+        root, out_rel = self._root_rel(Path(path))
+        return out_rel.as_posix() in self.packed[root]
+
+    def finished(self, rel):
+        """All outputs of scan `rel` are written (or will not be): pack the groups it completes."""
+        groups = set()
+        for path in self.outputs.get(rel, []):
+            group = self._group(rel, path)
+            self._pending[group].discard(rel)
+            self._members.setdefault(group, []).append(path)
+            groups.add(group)
+        for group in groups:
+            if not self._pending[group]:
+                self._pack(group)
+
+    def close(self):
+        """Pack what is left of unfinished groups (a run that stopped early)."""
+        for group in list(self._members):
+            self._pack(group)
+
+    def _pack(self, group):
+        root, parent, sequence = group
+        paths = [p for p in self._members.pop(group, []) if p.exists()]
+        if not paths:
+            return
+        write_shard(free_shard_path(root / parent, sequence), root, [p.relative_to(root) for p in paths])
+        for p in paths:
+            p.unlink()
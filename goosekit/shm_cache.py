@@ -0,0 +1,178 @@
+import threading
+from pathlib import Path
+from collections import OrderedDict, deque
+from multiprocessing import resource_tracker, shared_memory
+
+from goosekit.shards import ShardReader, ShardStore, open_store
+
+'''
+Shared-memory cache of the original scans for Pool runs.
+
+Instead of every worker reading its original .bin / .label from scratch storage,
+the parent copies the files a task needs into one multiprocessing.shared_memory
+block while the pool is busy with earlier tasks (read-ahead), and appends a small
+handle (block name + {rel: (offset, length)}) to the task. The worker attaches
+to the block by name and reads it through the usual store interface
+(attach_store(handle).read_bin_xyz_intensity(rel), .array(rel, dtype), ...), so
+nothing is pickled or copied on the way.
+
+The blocks form an LRU bounded by a byte budget: a block is in use from the
+moment its task is generated until the parent has received the task's result,
+released blocks are evicted least recently used first, and task generation
+waits while the budget is full of blocks still in use. abort() (and close())
+ends that wait: the cache then raises from acquire() instead of handing out
+blocks, so a run aborted by a worker error does not leave the Pool's task
+handler blocked.
+'''
+
+_ALIGN = 64
+# how often a task generation waiting for room re-checks whether the cache was closed
+_WAIT_S = 1.0
+
+
+class SharedScanCache:
+    """Parent side: builds the blocks, hands out handles, evicts (see module docstring)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()     # key -> [SharedMemory, handle, users]
+        self._bytes = 0
+        self._pending = deque()          # keys of generated tasks whose results are outstanding
+        self._cond = threading.Condition()
+        self.closed = False
+        # create the cache before the Pool: workers then share this tracker, so their
+        # attach does not start one of their own that unlinks the blocks when they exit
+        resource_tracker.ensure_running()
+
+    def acquire(self, members: dict):
+        """Handle of a block holding `members` {rel: root} read from open_store(root); None if empty."""
+        if not members:
+            with self._cond:
+                self._pending.append(None)
+            return None
+        key = tuple(sorted((str(root), Path(rel).as_posix()) for rel, root in members.items()))
+        with self._cond:
+            self._check_open()
+            if key in self._blocks:
+                self._blocks.move_to_end(key)
+                self._blocks[key][2] += 1
+                self._pending.append(key)
+                return self._blocks[key][1]
+
+        datas = {Path(rel).as_posix(): open_store(Path(root)).read_bytes(rel) for rel, root in members.items()}
+        index, size = {}, 0
+        for rel, data in datas.items():
+            size += -size % _ALIGN
+            index[rel] = (size, len(data))
+            size += len(data)
+
+        with self._cond:
+            self._make_room(size)
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            for rel, (offset, length) in index.items():
+                shm.buf[offset:offset + length] = datas[rel]
+            handle = (shm.name, index)
+            self._blocks[key] = [shm, handle, 1]
+            self._bytes += shm.size
+            self._pending.append(key)
+            return handle
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError("SharedScanCache is closed (the run was aborted)")
+
+    def _make_room(self, size: int):
+        # also checked when there is room: no block may be created after abort()
+        self._check_open()
+        while self._bytes + size > self.max_bytes:
+            free = [k for k, (_, _, users) in self._blocks.items() if users == 0]
+            if free:
+                self._evict(free[0])
+            elif self._blocks:
+                # everything cached is still in use: wait for a result (or abort())
+                self._cond.wait(timeout=_WAIT_S)
+                self._check_open()
+            else:
+                return   # a single block larger than the budget
+
+    def _evict(self, key):
+        shm, _, _ = self._blocks.pop(key)
+        self._bytes -= shm.size
+        shm.close()
+        shm.unlink()
+
+    def preload(self, tasks, originals):
+        """Yield every task with the handle of its block appended; originals[i] is the {rel: root} of tasks[i]."""
+        for task, members in zip(tasks, originals):
+            yield task + (self.acquire(members),)
+
+    def task_done(self):
+        """Release the block of the oldest outstanding task (results arrive in task order with imap)."""
+        with self._cond:
+            key = self._pending.popleft() if self._pending else None
+            if key is None or key not in self._blocks:
+                return
+            self._blocks[key][2] -= 1
+            self._cond.notify_all()
+
+    def abort(self):
+        """Stop handing out blocks and wake a task generation waiting for room (it raises from then on)."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def close(self):
+        """abort() and unlink every block (once no worker attaches to them any more)."""
+        with self._cond:
+            self.abort()
+            for key in list(self._blocks):
+                self._evict(key)
+
+
+# worker side: attached blocks stay open while arrays may still point into them
+_ATTACHED = OrderedDict()
+_KEEP_ATTACHED = 2
+
+
+class SharedBlockReader(ShardReader):
+    """ShardReader over an attached shared-memory block."""
+
+    def __init__(self, handle):
+        name, self.index = handle
+        self.path = name
+        if name not in _ATTACHED:
+            _ATTACHED[name] = shared_memory.SharedMemory(name=name)
+        _ATTACHED.move_to_end(name)
+        self._mm = _ATTACHED[name].buf
+        _close_stale()
+
+
+def _close_stale():
+    for name in list(_ATTACHED)[:-_KEEP_ATTACHED]:
+        try:
+            _ATTACHED[name].close()
+        except BufferError:
+            continue   # arrays of an earlier task are still alive; retry next time
+        del _ATTACHED[name]
+
+
+class SharedStore(ShardStore):
+    """Store over one shared-memory block: the same reads as open_store() of the original roots."""
+
+    def __init__(self, handle):
+        reader = SharedBlockReader(handle)
+        self.root = None
+        self.shard_paths = []
+        self._where = {rel: reader.path for rel in reader.index}
+        self._readers = {reader.path: reader}
+
+
+def attach_store(handle) -> SharedStore:
+    return SharedStore(handle)
+
+
+def with_scans(tasks, cache, originals):
+    """`tasks` with the block handle of their scans appended (None for every task without a cache)."""
+    if cache is None:
+        return [task + (None,) for task in tasks]
+    return cache.preload(tasks, originals)
@@ -0,0 +1,156 @@
+from itertools import islice
+import numpy as np
+
+from goosekit.binio import BIN_FIELDS
+from goosekit.ply import ascii_rows, ply_header, read_ply_header, _vertex_start
+from goosekit.quantize import QuantizedKeySet, keys_to_quantized
+
+'''
+Chunked reading and writing of point clouds that do not fit in memory at once
+(e.g. whole sequence maps merged from many scans).
+
+Readers are generators yielding fixed-size chunks of at most `chunk_points`
+points (the last one may be shorter); writers take the chunks one by one. Peak
+memory is one chunk per reader / writer, except for QuantizedPlyWriter, which
+has to hold the deduplicated 8 byte keys of its output.
+'''
+
+DEFAULT_CHUNK_POINTS = 1 << 20
+
+
+def iter_array_chunks(path, dtype, cols: int = 1, chunk_rows: int = DEFAULT_CHUNK_POINTS):
+    """(rows, cols) chunks of a headerless binary file (copies of a memory map slice)."""
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            # mmap cannot map an empty file
+            return
+    mm = np.memmap(path, dtype=dtype, mode='r')
+    if mm.size % cols:
+        raise ValueError(f"Unexpected value count in {path}: {mm.size} is not a multiple of {cols}")
+    mm = mm.reshape(-1, cols)
+    for start in range(0, mm.shape[0], chunk_rows):
+        yield np.array(mm[start:start + chunk_rows])
+
+
+def iter_bin_chunks(path, chunk_points: int = DEFAULT_CHUNK_POINTS):
+    """float32 (n, 4) x y z intensity chunks of a .bin scan."""
+    return iter_array_chunks(path, '<f4', BIN_FIELDS, chunk_points)
+
+
+def iter_label_chunks(path, chunk_points: int = DEFAULT_CHUNK_POINTS):
+    """uint32 (n,) chunks of a .label file."""
+    for chunk in iter_array_chunks(path, '<u4', 1, chunk_points):
+        yield chunk[:, 0]
+
+
+def iter_ply_chunks(path, chunk_points: int = DEFAULT_CHUNK_POINTS, fields=('x', 'y', 'z'), header=None):
+    """float32 (n, len(fields)) chunks of the vertex properties `fields` of a PLY."""
+    if header is None:
+        header = read_ply_header(path)
+    skip = _vertex_start(header, path)
+    n, props = header.element('vertex')
+    names = [prop for prop, _ in props]
+    missing = [fld for fld in fields if fld not in names]
+    if missing:
+        raise ValueError(f"PLY vertex element of {path} has no {missing} properties (has {names})")
+    cols = [names.index(fld) for fld in fields]
+
+    with open(path, 'rb') as f:
+        if header.format == 'ascii':
+            f.seek(header.body_offset)
+            for _ in range(sum(count for _, count in skip)):
+                f.readline()
+            for start in range(0, n, chunk_points):
+                lines = list(islice(f, min(chunk_points, n - start)))
+                values = np.array(b''.join(lines).split(), dtype=np.float64)
+                if len(lines) < min(chunk_points, n - start) or values.size != len(lines) * len(names):
+                    raise ValueError(f"PLY {path} body does not match its {n} declared vertices")
+                yield values.reshape(len(lines), len(names))[:, cols].astype(np.float32)
+        else:
+            f.seek(header.body_offset + sum(header.dtype(name).itemsize * count for name, count in skip))
+            dtype = header.dtype('vertex')
+            for start in range(0, n, chunk_points):
+                records = np.fromfile(f, dtype=dtype, count=min(chunk_points, n - start))
+                if records.shape[0] < min(chunk_points, n - start):
+                    raise ValueError(f"PLY {path} declares {n} vertices but its body is truncated")
+                yield np.stack([records[fld] for fld in fields], axis=1).astype(np.float32)
+
+
+class ChunkWriter:
+    """Base of the chunk writers: write(chunk) per chunk, close() at the end (or use `with`)."""
+
+    def write(self, chunk: np.ndarray):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PlyChunkWriter(ChunkWriter):
+    """PLY of `n` float32 vertices (the count goes into the header up front)."""
+
+    def __init__(self, path, n: int, binary: bool = False, fields=('x', 'y', 'z')):
+        self.binary = binary
+        self.fields = fields
+        self.f = open(path, 'wb')
+        self.f.write(ply_header(n, 'binary_little_endian' if binary else 'ascii', fields))
+
+    def write(self, chunk):
+        chunk = np.ascontiguousarray(chunk, dtype='<f4').reshape(-1, len(self.fields))
+        self.f.write(chunk.tobytes() if self.binary else ascii_rows(chunk))
+
+    def close(self):
+        self.f.close()
+
+
+class RawChunkWriter(ChunkWriter):
+    """Headerless binary file of the chunks' raw bytes (e.g. .bin / .label)."""
+
+    def __init__(self, path, dtype='<f4'):
+        self.dtype = dtype
+        self.f = open(path, 'wb')
+
+    def write(self, chunk):
+        self.f.write(np.ascontiguousarray(chunk, dtype=self.dtype).tobytes())
+
+    def close(self):
+        self.f.close()
+
+
+class ColumnChunkWriter(ChunkWriter):
+    """One headerless float32 file per column (e.g. the LCP x / y / z .dat files)."""
+
+    def __init__(self, paths):
+        self.files = [open(p, 'wb') for p in paths]
+
+    def write(self, chunk):
+        for col, f in enumerate(self.files):
+            f.write(np.ascontiguousarray(chunk[:, col], dtype='<f4').tobytes())
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+class QuantizedPlyWriter(ChunkWriter):
+    """ASCII PLY of the quantized, deduplicated points (the file write_ply_ascii(quantize(points)) writes)."""
+
+    def __init__(self, path, chunk_points: int = DEFAULT_CHUNK_POINTS):
+        self.path = path
+        self.chunk_points = chunk_points
+        self.key_set = QuantizedKeySet()
+
+    def write(self, chunk):
+        self.key_set.add(chunk[:, :3])
+
+    def close(self):
+        keys = self.key_set.keys()
+        with PlyChunkWriter(self.path, keys.size) as out:
+            for start in range(0, keys.size, self.chunk_points):
+                out.write(keys_to_quantized(keys[start:start + self.chunk_points]))
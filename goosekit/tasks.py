@@ -0,0 +1,109 @@
+from pathlib import Path
+from multiprocessing import Pool
+from tqdm import tqdm
+
+from goosekit.index_cache import GB, shared_cache
+from goosekit.labels import label_rel_path
+from goosekit.manifest import list_files
+from goosekit.shm_cache import SharedScanCache, with_scans
+
+'''
+Task planning helpers for scripts that process several decompressed trees (one
+per Q level / codec) against the same original scans, and the Pool loop that
+runs their one-task-per-original-scan workers.
+'''
+
+
+def per_root(values, n_roots: int, name: str):
+    """Broadcast a single CLI value to every root, or check there is one per root."""
+    if len(values) == 1:
+        return list(values) * n_roots
+    if len(values) != n_roots:
+        raise ValueError(f"--{name} needs 1 value or one per root ({n_roots}), got {len(values)}")
+    return list(values)
+
+
+def group_by_scan(roots, pattern: str, suffix: str = '.bin'):
+    """Group files matching `pattern` under every root by the scan they belong to.
+
+    Returns {rel: [(root_idx, path), ...]} where `rel` is the path relative to its
+    root with its suffix swapped for `suffix` (the original scan's relative path),
+    i.e. the same key for Q_8/val/x.ply and Q_512/val/x.ply. Sorted by rel so work
+    order is stable between runs. Roots with a manifest.parquet are not walked.
+    """
+    groups = {}
+    for root_idx, root in enumerate(roots):
+        for rel in list_files(root, pattern):
+            groups.setdefault(rel.with_suffix(suffix), []).append((root_idx, Path(root) / rel))
+    return dict(sorted(groups.items()))
+
+
+def grid_step_from_root(root, unit: float = 0.001):
+    """Decompressed grid spacing (posQ x 1 mm) from a `Q_<posQ>` component of `root`, or None."""
+    for part in reversed(Path(root).parts):
+        if part.startswith('Q_') and part[2:].isdigit():
+            return int(part[2:]) * unit
+    return None
+
+
+def voxel_sizes_for_roots(voxel_size_args, roots):
+    """--voxel_size values per root; missing values are taken from the Q_<posQ> root names."""
+    if voxel_size_args:
+        return per_root(voxel_size_args, len(roots), 'voxel_size')
+    return [grid_step_from_root(root) for root in roots]
+
+
+def scan_originals(rel: Path, outputs, orig_bin_root, orig_label_root=None):
+    """{rel: root} of the original scan (and its label) a task reads, or {} if every path in `outputs` exists."""
+    if all(out.exists() for out in outputs):
+        return {}
+    originals = {rel: orig_bin_root}
+    if orig_label_root is not None:
+        originals[label_rel_path(rel)] = orig_label_root
+    return originals
+
+
+def run_scan_tasks(worker, tasks, originals, num_workers: int, desc: str, verb: str,
+                   shm_cache_gb: float = 0.0, index_cache=None, packer=None):
+    """
+    Run `worker` over `tasks` on a Pool and return the report rows of all of them.
+
+    A worker returns (outputs, rows); every output is printed as `<verb>: <output>`.
+    originals[i] is the scan_originals() of tasks[i]: with shm_cache_gb > 0 they
+    are read ahead into shared memory and task i gets the block handle appended
+    (None without the cache, see goosekit.shm_cache). With a ShardPacker the
+    outputs of each finished task (tasks start with their scan's rel) are packed
+    into shards as their sequences complete. The index cache, if any, is trimmed
+    to its budget at the end.
+    """
+    rows = []
+    scan_cache = SharedScanCache(int(shm_cache_gb * GB)) if shm_cache_gb > 0 else None
+    try:
+        with Pool(processes=num_workers) as pool:
+            try:
+                results = pool.imap(worker, with_scans(tasks, scan_cache, originals))
+                for task in tqdm(tasks, desc=desc):
+                    try:
+                        outs, file_rows = next(results)
+                    finally:
+                        # the task's block is released even if its worker raised
+                        if scan_cache:
+                            scan_cache.task_done()
+                    rows.extend(file_rows)
+                    for out in outs:
+                        print(f"{verb}: {out}")
+                    if packer:
+                        packer.finished(task[0])
+            finally:
+                # the Pool joins its task handler on the way out, which may be waiting for room in the cache
+                if scan_cache:
+                    scan_cache.abort()
+    finally:
+        # unlinked once the workers are gone
+        if scan_cache:
+            scan_cache.close()
+        if packer:
+            packer.close()
+    if index_cache:
+        shared_cache(*index_cache).evict()
+    return rows
@@ -1,10 +1,14 @@
 import os
+import sys
 import argparse
 from pathlib import Path
-import numpy as np
 from tqdm import tqdm
 import multiprocessing
 
+# goosekit lives in the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from goosekit.binio import read_bin_xyz
+
 """
 Parallel conversion of .bin LiDAR files to three separate .dat files (x, y, z) for LCP compression.
 Strips out intensity and preserves directory structure.
@@ -28,20 +32,16 @@ def convert_file(args):
     out_dir = output_root / rel.parent
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Read binary data as float32, reshape into N x 4
-    data = np.fromfile(str(bin_path), dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: {data.size}")
-    points = data.reshape(-1, 4)
-    xyz = points[:, :3]
+    # Memory-mapped N x 3 view of the xyz columns (no eager read / copy)
+    xyz = read_bin_xyz(bin_path)
 
     # Write separate .dat files for x, y, z
     x_dat = out_dir / f"{stem}_x.dat"
     y_dat = out_dir / f"{stem}_y.dat"
     z_dat = out_dir / f"{stem}_z.dat"
-    xyz[:, 0].astype(np.float32).reshape(1, -1).tofile(str(x_dat))
-    xyz[:, 1].astype(np.float32).reshape(1, -1).tofile(str(y_dat))
-    xyz[:, 2].astype(np.float32).reshape(1, -1).tofile(str(z_dat))
+    xyz[:, 0].tofile(str(x_dat))
+    xyz[:, 1].tofile(str(y_dat))
+    xyz[:, 2].tofile(str(z_dat))
 
     return (x_dat, y_dat, z_dat)
 
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 import os
+import sys
 import argparse
 from pathlib import Path
 import numpy as np
 from tqdm import tqdm
 import multiprocessing
 
+# goosekit lives in the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from goosekit.ply import write_ply_ascii
+
 """
 Parallel conversion of separate x/y/z .dat files back into ASCII PLYs.
 
@@ -50,20 +55,8 @@ def convert_dat_to_ply(args):
     if not (x.size == y.size == z.size):
         raise ValueError(f"Length mismatch in {rel}")
 
-    npts = x.size
-
-    # write ASCII PLY
-    with open(out_ply, 'w') as f:
-        f.write("ply\n")
-        f.write("format ascii 1.0\n")
-        f.write(f"element vertex {npts}\n")
-        f.write("property float x\n")
-        f.write("property float y\n")
-        f.write("property float z\n")
-        f.write("end_header\n")
-        # body
-        for xi, yi, zi in zip(x, y, z):
-            f.write(f"{xi} {yi} {zi}\n")
+    # write ASCII PLY (bulk formatted, round-trip exact float32)
+    write_ply_ascii(out_ply, np.stack((x, y, z), axis=1))
 
     return out_ply
 
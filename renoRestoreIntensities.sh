@@ -1,5 +1 @@
-python restore_intensity_feature_dataset_parallel2.py   --ply_root goose-dataset/reno_decompressed_lidar/Q_512   --orig_bin_root goose-dataset/lidar   --threshold 0.45   --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_512
-
-python restore_intensity_feature_dataset_parallel2.py   --ply_root goose-dataset/reno_decompressed_lidar/Q_64   --orig_bin_root goose-dataset/lidar   --threshold 0.059   --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_64
-
-python restore_intensity_feature_dataset_parallel2.py   --ply_root goose-dataset/reno_decompressed_lidar/Q_8   --orig_bin_root goose-dataset/lidar   --threshold 0.007   --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_8 
\ No newline at end of file
+python restore_intensity_feature_dataset_parallel2.py   --ply_root goose-dataset/reno_decompressed_lidar/Q_8 goose-dataset/reno_decompressed_lidar/Q_64 goose-dataset/reno_decompressed_lidar/Q_512   --orig_bin_root goose-dataset/lidar   --threshold 0.007 0.059 0.45   --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_8 goose-dataset/reno_bin_decompressed_lidar/Q_64 goose-dataset/reno_bin_decompressed_lidar/Q_512 
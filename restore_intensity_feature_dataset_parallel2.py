@@ -2,15 +2,29 @@ import os
 import argparse
 from pathlib import Path
 import numpy as np
-import open3d as o3d
-from multiprocessing import Pool
-from tqdm import tqdm
+
+from goosekit.attributes import WEIGHTINGS, interpolate
+from goosekit.cli import add_nn_args, index_cache_from_args
+from goosekit.index_cache import shared_cache
+from goosekit.neighbors import ScanMatcher
+from goosekit.ply import read_ply
+from goosekit.report import finish_reports, threshold_check
+from goosekit.shards import ShardPacker, open_store
+from goosekit.shm_cache import attach_store
+from goosekit.tasks import group_by_scan, per_root, run_scan_tasks, scan_originals, voxel_sizes_for_roots
 
 '''
 Parallel intensity restoration using nearest-neighbor lookup:
 - Reads decompressed PLYs, reads original BIN (xyz+intensity)
-- For each decompressed point, finds nearest original point (KD-tree)
-- Assigns intensity if within threshold, else error
+- Finds the nearest original point for all decompressed points in one batched
+  KD-tree query (optionally multithreaded with --query_threads)
+- For lossless round trips --match_mode exact/auto joins on packed 1 mm grid keys
+  instead, only falling back to the KD-tree for points without an exact match
+- With --k > 1 the intensity is interpolated from the k nearest original points
+  (--weighting inverse_distance / gaussian) instead of copied from the nearest one
+- Checks the match distances against --threshold per file: distance statistics
+  go to a sidecar report and --threshold_policy decides what happens to files
+  with far points (fail / warn / drop_points) without stopping the run
 - Outputs merged BIN files
 
 Usage:
@@ -27,98 +41,149 @@ python restore_intensity_nn.py \
   --orig_bin_root goose-dataset/lidar \
   --threshold 0.33 \
   --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_512
-  
-'''
-
-def read_ply_xyz(ply_path: Path):
-    pcd = o3d.io.read_point_cloud(str(ply_path), format='ply')
-    return np.asarray(pcd.points, dtype=np.float32)
 
+  # 4 pool workers x 4 query threads each, on a 16 core node
+  python restore_intensity_feature_dataset_parallel2.py \
+  --ply_root goose-dataset/reno_decompressed_lidar/Q_128 \
+  --orig_bin_root goose-dataset/lidar \
+  --no_threshold \
+  --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_128 \
+  --num_workers 4 \
+  --query_threads 4
 
-def read_bin_xyz_intensity(bin_path: Path):
-    data = np.fromfile(str(bin_path), dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: got {data.size}")
-    pts = data.reshape(-1, 4)
-    return pts[:, :3].astype(np.float32), pts[:, 3].astype(np.float32)
+  # all Q levels at once: each original scan is read and indexed once
+  python restore_intensity_feature_dataset_parallel2.py \
+  --ply_root goose-dataset/reno_decompressed_lidar/Q_8 goose-dataset/reno_decompressed_lidar/Q_64 goose-dataset/reno_decompressed_lidar/Q_512 \
+  --orig_bin_root goose-dataset/lidar \
+  --threshold 0.007 0.059 0.45 \
+  --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_8 goose-dataset/reno_bin_decompressed_lidar/Q_64 goose-dataset/reno_bin_decompressed_lidar/Q_512
 
+  # coarse level: gaussian-weighted mean of the 8 nearest originals (sigma defaults to posQ x 1 mm)
+  python restore_intensity_feature_dataset_parallel2.py \
+  --ply_root goose-dataset/reno_decompressed_lidar/Q_512 \
+  --orig_bin_root goose-dataset/lidar \
+  --threshold 0.45 \
+  --k 8 --weighting gaussian \
+  --out_bin_root goose-dataset/reno_bin_decompressed_lidar_k8/Q_512
+  
+'''
 
 def convert_intensity_nn(args):
-    ply_path, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold = args
-    rel = ply_path.relative_to(ply_root).with_suffix('.bin')
-    orig_bin = orig_bin_root / rel
-    out_bin = out_bin_root / rel
-    if out_bin.exists():
-        return out_bin
-    
-    out_bin.parent.mkdir(parents=True, exist_ok=True)
-
-    # Load points
-    xyz_dec = read_ply_xyz(ply_path)
-    xyz_orig, intensity_orig = read_bin_xyz_intensity(orig_bin)
-
-   # Build KD-tree on original xyz: wrap coords in a PointCloud
-    pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(xyz_orig)
-    pcd_tree = o3d.geometry.KDTreeFlann(pcd)
-
-    # For each decompressed point, find NN
-    recovered_i = np.empty((xyz_dec.shape[0],), dtype=np.float32)
-    for idx, pt in enumerate(xyz_dec):
-        try:
-            [_, idxs, dists] = pcd_tree.search_knn_vector_3d(pt, 1)
-        except RuntimeError:
-            raise RuntimeError(f"KD-tree lookup failed for point index {idx} in {ply_path}")
-         
-        if not no_threshold:
-            dist = np.sqrt(dists[0])
-            if dist > threshold:
-                raise ValueError(f"No original point within {threshold} for {ply_path} point index {idx} (dist={dist})")
-        recovered_i[idx] = intensity_orig[idxs[0]]
-
-    # Merge and write
-    merged = np.hstack((xyz_dec, recovered_i.reshape(-1,1))).astype(np.float32)
-    merged.tofile(str(out_bin))
-    return out_bin
+    """
+    Worker: restore intensity for every decompressed version (Q level) of one
+    original scan. The original is read and indexed once for all of them.
+    """
+    rel, levels, orig_bin_root, no_threshold, nn_backend, query_threads, match_mode, index_cache, k, weighting, threshold_policy, shared = args
+    todo = [lvl for lvl in levels if not lvl[1].exists()]
+    if not todo:
+        return [lvl[1] for lvl in levels], []
+
+    orig_bins = attach_store(shared) if shared else open_store(orig_bin_root)
+    xyz_orig, intensity_orig = orig_bins.read_bin_xyz_intensity(rel)
+    cache = shared_cache(*index_cache) if index_cache else None
+    matcher = ScanMatcher(xyz_orig, backend=nn_backend, workers=query_threads,
+                          cache=cache, scan_key=orig_bins.digest(rel) if cache else None)
+
+    rows = []
+    for ply_path, out_bin, threshold, voxel_size, sigma in todo:
+        out_bin.parent.mkdir(parents=True, exist_ok=True)
+        xyz_dec = read_ply(ply_path)
+
+        if k > 1 and weighting != 'nearest':
+            # k nearest originals of every point in one batched query, reduced in one gather
+            knn_dists, knn_idxs = matcher.knn(xyz_dec, k, voxel_size=voxel_size)
+            dists = knn_dists[:, 0]
+        else:
+            # Match every decompressed point at once (exact coordinate join and/or batched NN query)
+            dists, idxs = matcher.match(xyz_dec, match_mode=match_mode, voxel_size=voxel_size)
+
+        row, keep = threshold_check(ply_path, out_bin, dists, None if no_threshold else threshold, threshold_policy)
+        rows.append(row)
+        if row['status'] == 'failed':
+            continue
+        if k > 1 and weighting != 'nearest':
+            recovered_i = interpolate(intensity_orig, knn_dists, knn_idxs, weighting, sigma)
+        else:
+            recovered_i = intensity_orig[idxs]
+
+        # Merge and write
+        merged = np.hstack((xyz_dec, recovered_i.reshape(-1,1))).astype(np.float32)
+        if keep is not None:
+            merged = merged[keep]
+        merged.tofile(str(out_bin))
+    return [lvl[1] for lvl in levels if lvl[1].exists()], rows
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Restore intensity via nearest-neighbor matching'
     )
-    parser.add_argument('--ply_root', '-p', type=str, required=True,
-                        help='Root directory of decompressed PLYs')
+    parser.add_argument('--ply_root', '-p', type=str, nargs='+', required=True,
+                        help='Root directory of decompressed PLYs (several roots, e.g. one per Q level, '
+                             'share one read + index build of each original scan)')
     parser.add_argument('--orig_bin_root', '-b', type=str, required=True,
-                        help='Root of original BINs (xyz+i)')
-    parser.add_argument('--out_bin_root', '-o', type=str, required=True,
-                        help='Output root for merged BINs')
-    parser.add_argument('--threshold', '-t', type=float, default=0.01,
-                        help='Distance threshold for NN matching')
+                        help='Root of original BINs (xyz+i; a directory tree or packed .shard files)')
+    parser.add_argument('--out_bin_root', '-o', type=str, nargs='+', required=True,
+                        help='Output root for merged BINs (one per --ply_root)')
+    parser.add_argument('--threshold', '-t', type=float, nargs='+', default=[0.01],
+                        help='Distance threshold for NN matching (one value, or one per --ply_root)')
     parser.add_argument('--no_threshold', '-s', action='store_true',
                         help='If specified then turns off threshold sanity check')
     parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
                         help='Parallel worker count')
+    add_nn_args(parser, shm_cache='original scans', drop_points='leaves the far points out')
+    parser.add_argument('--k', type=int, default=1,
+                        help='Number of nearest original points the intensity is computed from')
+    parser.add_argument('--weighting', type=str, default='nearest', choices=WEIGHTINGS,
+                        help="How the k intensities are combined: 'nearest' copies the closest one, "
+                             "'inverse_distance' / 'gaussian' take a weighted mean (k > 1 always uses "
+                             "--nn_backend, not --match_mode)")
+    parser.add_argument('--sigma', type=float, nargs='+', default=None,
+                        help='Gaussian sigma (m), one value or one per root (default: the voxel size, posQ x 1 mm)')
     args = parser.parse_args()
 
-    ply_root = Path(args.ply_root)
+    if len(args.out_bin_root) != len(args.ply_root):
+        parser.error("--out_bin_root needs one root per --ply_root")
+    ply_roots = [Path(p) for p in args.ply_root]
     orig_bin_root = Path(args.orig_bin_root)
-    out_bin_root = Path(args.out_bin_root)
-    threshold = args.threshold
+    out_bin_roots = [Path(p) for p in args.out_bin_root]
+    thresholds = per_root(args.threshold, len(ply_roots), 'threshold')
+    voxel_sizes = voxel_sizes_for_roots(args.voxel_size, ply_roots)
+    if args.k < 1:
+        parser.error("--k must be >= 1")
+    sigmas = per_root(args.sigma, len(ply_roots), 'sigma') if args.sigma else voxel_sizes
+    if args.weighting == 'gaussian' and args.k > 1 and None in sigmas:
+        parser.error("--weighting gaussian needs --sigma (or Q_<posQ> root names to derive it from)")
     no_threshold = args.no_threshold
     num_workers = args.num_workers
-
-    # Gather PLY files
-    ply_files = list(ply_root.rglob('*.ply'))
-    print(f"Found {len(ply_files)} PLY files under {ply_root}")
-
-    # Prepare tasks
-    tasks = [(p, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold) for p in ply_files]
+    nn_backend = args.nn_backend
+    query_threads = args.query_threads
+    match_mode = args.match_mode
+    index_cache = index_cache_from_args(args)
+
+    # Gather PLY files of every root, grouped by original scan
+    groups = group_by_scan(ply_roots, '*.ply')
+    n_files = sum(len(g) for g in groups.values())
+    print(f"Found {n_files} PLY files for {len(groups)} original scans under {len(ply_roots)} root(s)")
+
+    # Prepare tasks: one per original scan, covering all its decompressed versions
+    packer = ShardPacker(out_bin_roots) if args.shard_outputs else None
+    tasks, originals = [], []
+    for rel, members in groups.items():
+        levels = [(ply_path, out_bin_roots[i] / rel, thresholds[i], voxel_sizes[i], sigmas[i]) for i, ply_path in members]
+        if packer:
+            # levels packed by an earlier run are done
+            levels = packer.add(rel, levels, lambda lvl: [lvl[1]])
+            if not levels:
+                continue
+        tasks.append((rel, levels, orig_bin_root, no_threshold, nn_backend, query_threads, match_mode, index_cache,
+                      args.k, args.weighting, args.threshold_policy))
+        originals.append(scan_originals(rel, [lvl[1] for lvl in levels], orig_bin_root))
 
     # Parallel processing
-    with Pool(processes=num_workers) as pool:
-        for out in tqdm(pool.imap(convert_intensity_nn, tasks), total=len(tasks), desc="Restoring intensity NN"):
-            print(f"Restored: {out}")
-
+    rows = run_scan_tasks(convert_intensity_nn, tasks, originals, num_workers, "Restoring intensity NN", "Restored",
+                          args.shm_cache_gb, index_cache, packer)
+    finish_reports(rows, args.report, out_bin_roots)
     print("Intensity restoration (NN) complete.")
 
 if __name__ == '__main__':
@@ -3,17 +3,27 @@ import os
 import argparse
 from pathlib import Path
 import numpy as np
-import open3d as o3d
 from multiprocessing import Pool
 from tqdm import tqdm
 
+from goosekit.cli import add_nn_args, index_cache_from_args
+from goosekit.index_cache import shared_cache
+from goosekit.neighbors import ScanMatcher
+from goosekit.ply import read_ply
+from goosekit.quantize import QUANT_OFFSET, reverse_quantize
+from goosekit.report import finish_reports, threshold_check
+from goosekit.shards import ShardPacker, open_store
+from goosekit.tasks import grid_step_from_root
+
 '''
 Parallel dequantization + intensity restoration:
 - Reads your ASCII PLYs (quantized xyz-only)
 - Reverses the 18bit→float quantization
 - Reads original BIN (xyz+intensity)
-- Builds a KD-tree on original xyz
-- For each dequantized point, does a 1‑NN lookup
+- Matches every dequantized point to an original point in one batched call:
+  a KD-tree 1-NN query (--match_mode nn) or a join on the packed int64 grid
+  keys that only falls back to NN for unmatched cells (--match_mode exact|auto)
+- Reports per-file distance statistics; --threshold_policy handles far points
 - Writes out merged BIN (x,y,z,i)
 
 Usage:
@@ -22,73 +32,52 @@ python dequant_and_restore_intensity.py \
   --orig_bin_root ./goose-pointcept/lidar \
   --out_bin_root  ./quantized_with_intensity \
   --threshold 0.01 \
-  --num_workers 8
+  --num_workers 8 \
+  --match_mode auto
 '''
 
-def read_ply_xyz(ply_path: Path):
-    """Load an ASCII PLY with only x y z as floats via Open3D."""
-    pcd = o3d.io.read_point_cloud(str(ply_path), format='ply')
-    return np.asarray(pcd.points, dtype=np.float32)
-
-def reverse_quantize(coords_q: np.ndarray) -> np.ndarray:
-    """
-    Reverse 18‑bit (1 mm) quantization:
-      coords_q = round(orig/0.001) + 131072
-    ⇒ orig = (coords_q - 131072) * 0.001
-    """
-    return (coords_q - 131072.0) * 0.001
-
-def read_bin_xyz_intensity(bin_path: Path):
-    """Read float32 .bin and split into (N×3 xyz, N intensities)."""
-    data = np.fromfile(str(bin_path), dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected float count in {bin_path}: {data.size}")
-    pts = data.reshape(-1, 4)
-    return pts[:, :3].astype(np.float32), pts[:, 3].astype(np.float32)
-
 def convert_intensity_nn(args):
     """
     Worker: dequantize + restore intensity for a single PLY.
-    Returns the path to the written BIN.
+    Returns the path to the written BIN (None if the threshold policy failed
+    the file) and the file's distance report row.
     """
-    ply_path, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold = args
+    ply_path, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold, nn_backend, query_threads, match_mode, voxel_size, index_cache, threshold_policy = args
 
     # derive relative path → original bin & output bin
     rel     = ply_path.relative_to(ply_root)
-    orig_bin = orig_bin_root / rel.with_suffix('.bin')
     out_bin  = out_bin_root  / rel.with_suffix('.bin')
     out_bin.parent.mkdir(parents=True, exist_ok=True)
 
     # 1) load & dequantize
-    xyz_dec_q = read_ply_xyz(ply_path)
+    xyz_dec_q = read_ply(ply_path)
     xyz_dec   = reverse_quantize(xyz_dec_q)
 
     # 2) load original xyz+intensity
-    xyz_orig, intensity_orig = read_bin_xyz_intensity(orig_bin)
-
-    # Build KD-tree on original xyz: wrap coords in a PointCloud
-    pcd = o3d.geometry.PointCloud()
-    pcd.points = o3d.utility.Vector3dVector(xyz_orig)
-    pcd_tree = o3d.geometry.KDTreeFlann(pcd)
-
-    # For each decompressed point, find NN
-    recovered_i = np.empty((xyz_dec.shape[0],), dtype=np.float32)
-    for idx, pt in enumerate(xyz_dec):
-        try:
-            [_, idxs, dists] = pcd_tree.search_knn_vector_3d(pt, 1)
-        except RuntimeError:
-            raise RuntimeError(f"KD-tree lookup failed for point index {idx} in {ply_path}")
-         
-        if not no_threshold:
-            dist = np.sqrt(dists[0])
-            if dist > threshold:
-                raise ValueError(f"No original point within {threshold} for {ply_path} point index {idx} (dist={dist})")
-        recovered_i[idx] = intensity_orig[idxs[0]]
+    orig_bins = open_store(orig_bin_root)
+    orig_rel = rel.with_suffix('.bin')
+    xyz_orig, intensity_orig = orig_bins.read_bin_xyz_intensity(orig_rel)
+
+    # 3) match every dequantized point at once; the quantized coords are the grid
+    #    cells themselves, so --match_mode exact/auto can join on them directly
+    dec_cells = np.round(xyz_dec_q).astype(np.int64) - QUANT_OFFSET
+    cache = shared_cache(*index_cache) if index_cache else None
+    matcher = ScanMatcher(xyz_orig, backend=nn_backend, workers=query_threads,
+                          cache=cache, scan_key=orig_bins.digest(orig_rel) if cache else None)
+    dists, idxs = matcher.match(xyz_dec, match_mode=match_mode,
+                                dec_cells=dec_cells, voxel_size=voxel_size)
+
+    row, keep = threshold_check(ply_path, out_bin, dists, None if no_threshold else threshold, threshold_policy)
+    if row['status'] == 'failed':
+        return None, row
+    recovered_i = intensity_orig[idxs]
 
     # Merge and write
     merged = np.hstack((xyz_dec, recovered_i.reshape(-1,1))).astype(np.float32)
+    if keep is not None:
+        merged = merged[keep]
     merged.tofile(str(out_bin))
-    return out_bin
+    return out_bin, row
 
 
 def main():
@@ -98,7 +87,7 @@ def main():
     p.add_argument("--ply_root",      "-p", required=True,
                    help="Root of your quantized-ascii PLYs (xyz-only)")
     p.add_argument("--orig_bin_root", "-b", required=True,
-                   help="Root of original BINs (xyz+intensity)")
+                   help="Root of original BINs (xyz+intensity; a directory tree or packed .shard files)")
     p.add_argument("--out_bin_root",  "-o", required=True,
                    help="Where to write merged BINs")
     p.add_argument("--threshold",     "-t", type=float, default=0.01,
@@ -108,6 +97,7 @@ def main():
     p.add_argument("--num_workers",   "-n", type=int,
                    default=os.cpu_count(),
                    help="Number of parallel workers")
+    add_nn_args(p, per_root=False, drop_points='leaves the far points out', report_in='--out_bin_root')
     args = p.parse_args()
 
     ply_root      = Path(args.ply_root)
@@ -116,22 +106,50 @@ def main():
     threshold     = args.threshold
     no_threshold  = args.no_threshold
     num_workers   = args.num_workers
+    nn_backend    = args.nn_backend
+    query_threads = args.query_threads
+    match_mode    = args.match_mode
+    voxel_size    = args.voxel_size or grid_step_from_root(ply_root)
+    index_cache   = index_cache_from_args(args)
 
     # collect all PLYs
     ply_files = list(ply_root.rglob("*.ply"))
     if not ply_files:
         raise RuntimeError(f"No PLYs found under {ply_root}")
 
+    packer = None
+    if args.shard_outputs:
+        # BINs packed by an earlier run are done
+        packer = ShardPacker([out_bin_root])
+        ply_files = [ply for ply in ply_files
+                     if packer.add(ply, [out_bin_root / ply.relative_to(ply_root).with_suffix('.bin')])]
+
     tasks = [
-        (ply, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold)
+        (ply, ply_root, orig_bin_root, out_bin_root, threshold, no_threshold,
+         nn_backend, query_threads, match_mode, voxel_size, index_cache, args.threshold_policy)
         for ply in ply_files
     ]
 
-    with Pool(processes=num_workers) as pool:
-        for out in tqdm(pool.imap_unordered(convert_intensity_nn, tasks),
-                        total=len(tasks),
-                        desc="Dequantize+Restore"):
-            print(f"Wrote: {out}")
+    rows = []
+    try:
+        with Pool(processes=num_workers) as pool:
+            # in task order with --shard_outputs, so the packer knows which scan finished
+            results = pool.imap(convert_intensity_nn, tasks) if packer else pool.imap_unordered(convert_intensity_nn, tasks)
+            for task, (out, row) in tqdm(zip(tasks, results),
+                                         total=len(tasks),
+                                         desc="Dequantize+Restore"):
+                rows.append(row)
+                if out is not None:
+                    print(f"Wrote: {out}")
+                if packer:
+                    packer.finished(task[0])
+    finally:
+        if packer:
+            packer.close()
+    if index_cache:
+        shared_cache(*index_cache).evict()
+
+    finish_reports(rows, args.report, [out_bin_root])
 
     print("All done!")
 
@@ -2,6 +2,8 @@ import numpy as np
 from pathlib import Path
 import argparse
 
+from goosekit.binio import read_bin_xyz
+
 '''
 
 python sanity_check_bin_ply_geom_only.py \
@@ -17,11 +19,6 @@ python sanity_check_bin_ply_geom_only.py \
 
 '''
 
-def read_bin_xyz(bin_path: Path):
-    data = np.fromfile(bin_path, dtype=np.float32)
-    pts = data.reshape(-1, 4)
-    return pts[:, :3]
-
 
 def read_ascii_ply(ply_path: Path):
     with open(ply_path, 'r') as f:
@@ -4,6 +4,9 @@ import argparse
 import glob
 import random
 
+from goosekit.binio import read_bin_xyz
+from goosekit.ply import read_ply, read_ply_header
+
 '''
 
 python sanity_check_bin_ply_geom_only_batch.py \
@@ -24,37 +27,6 @@ python sanity_check_bin_ply_geom_only_batch.py \
 
 '''
 
-def read_bin_xyz(bin_path: Path):
-    """Read XYZ coordinates from a binary file"""
-    data = np.fromfile(bin_path, dtype=np.float32)
-    pts = data.reshape(-1, 4)
-    return pts[:, :3]
-
-def read_ascii_ply(ply_path: Path):
-    """Read XYZ coordinates from an ASCII PLY file"""
-    with open(ply_path, 'r') as f:
-        # read header
-        line = f.readline().strip()
-        if line != 'ply':
-            raise ValueError('Not a PLY file')
-        
-        # parse until end_header
-        vertex_count = 0
-        while True:
-            line = f.readline().strip()
-            if line.startswith('element vertex'):
-                vertex_count = int(line.split()[-1])
-            if line == 'end_header':
-                break
-        
-        # read points
-        pts = np.zeros((vertex_count, 3), dtype=np.float32)
-        for i in range(vertex_count):
-            parts = f.readline().strip().split()
-            if len(parts) >= 3:
-                pts[i] = [float(parts[0]), float(parts[1]), float(parts[2])]
-        return pts
-
 def compare_arrays(a: np.ndarray, b: np.ndarray):
     """Compare two numpy arrays with tolerance for floating-point precision"""
     if a.shape != b.shape:
@@ -105,7 +77,7 @@ def main():
         print(f"\nTesting single file: {p_bin.name}")
         try:
             xyz_bin = read_bin_xyz(p_bin)
-            xyz_ascii = read_ascii_ply(p_ascii)
+            xyz_ascii = read_ply(p_ascii)
             ok, msg = compare_arrays(xyz_bin, xyz_ascii)
             print(f'BIN vs ASCII PLY: {msg}')
             if ok:
@@ -161,8 +133,12 @@ def main():
         # Read and compare
         try:
             xyz_bin = read_bin_xyz(bin_path)
-            xyz_ascii = read_ascii_ply(ply_path)
-            ok, msg = compare_arrays(xyz_bin, xyz_ascii)
+            # point count from the header first: a mismatch fails without reading the body
+            header = read_ply_header(ply_path)
+            if header.vertex_count() != xyz_bin.shape[0]:
+                ok, msg = False, f'Point count mismatch: {xyz_bin.shape[0]} vs {header.vertex_count()} ({header.format})'
+            else:
+                ok, msg = compare_arrays(xyz_bin, read_ply(ply_path, header=header))
             
             status = "PASS" if ok else "FAIL"
             results.append({
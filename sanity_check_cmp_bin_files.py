@@ -4,14 +4,14 @@ import argparse
 import numpy as np
 from pathlib import Path
 
+from goosekit.binio import map_bin
+
 def load_bin(path: Path):
-    data = np.fromfile(path, dtype=np.float32)
-    if data.size % 4 == 0:
-        pts = data.reshape(-1, 4)
-    else:
+    try:
+        return map_bin(path)
+    except ValueError:
         # fallback: assume only xyz
-        pts = data.reshape(-1, 3)
-    return pts
+        return np.fromfile(path, dtype=np.float32).reshape(-1, 3)
 
 def main():
     p = argparse.ArgumentParser(
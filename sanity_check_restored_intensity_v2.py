@@ -6,6 +6,9 @@ from pathlib import Path
 import numpy as np
 from tqdm import tqdm
 
+# read-only memory-mapped (N, 4) float32 view: x, y, z, i
+from goosekit.binio import map_bin as read_bin
+
 '''
 HOW TO USE:
 1) Generate your restored bins:
@@ -21,13 +24,6 @@ HOW TO USE:
      --restored_bin_root goose-dataset/test_restored_intensity_bin_lidar
 '''
 
-def read_bin(path):
-    """Read a .bin of float32s and reshape (-1,4) -> (x,y,z,i)."""
-    data = np.fromfile(str(path), dtype=np.float32)
-    if data.size % 4 != 0:
-        raise ValueError(f"Unexpected element count in {path}: {data.size}")
-    return data.reshape(-1, 4)
-
 def main():
     parser = argparse.ArgumentParser(
         description="Sanity‐check restored intensities against original BINs"
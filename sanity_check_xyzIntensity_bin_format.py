@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
-import os
 import sys
 import argparse
 from pathlib import Path
-import numpy as np
 from tqdm import tqdm
 
+from goosekit.binio import map_bin
+
 """
 Sanity check script for verifying .bin files can be read and parsed
 as (x, y, z, intensity) float32 point clouds.
@@ -17,11 +17,8 @@ python sanity_check_bin_loading.py \
 
 def check_bin_file(bin_path):
     try:
-        scan = np.fromfile(str(bin_path), dtype=np.float32)
-        if scan.size % 4 != 0:
-            return False, f"Unexpected float count ({scan.size})"
-
-        scan = scan.reshape((-1, 4))
+        # checks the float count and maps the file as (N, 4) float32
+        scan = map_bin(bin_path)
         _ = scan[:, 0:3]  # xyz
         _ = scan[:, 3]    # remission
         return True, None
@@ -0,0 +1,55 @@
+import os
+import time
+import argparse
+from pathlib import Path
+from collections import Counter
+
+from goosekit.ply_index import PLY_INDEX_NAME, scan_ply_headers
+
+'''
+Read only the headers of every PLY under a root (thread pool) and report the
+formats, vertex layouts and point counts; the headers are cached in
+<root>/ply_index.json for later runs and for readers (read_ply(path, header=...)).
+
+Usage:
+python scan_ply_headers.py \
+  --root /scratch/aniemcz/goose-pointcept/ply_xyz_only_lidar \
+  --threads 32
+
+python scan_ply_headers.py --root ./decompressed_with_intensity --list
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan PLY headers: vertex counts, property layout, format')
+    parser.add_argument('--root', '-r', type=str, required=True, help='Root directory of PLY files')
+    parser.add_argument('--pattern', type=str, default='*.ply', help='File name pattern')
+    parser.add_argument('--threads', '-t', type=int, default=min(32, 4 * os.cpu_count()),
+                        help='Threads reading headers')
+    parser.add_argument('--no_cache', action='store_true',
+                        help=f'Neither read nor write {PLY_INDEX_NAME}')
+    parser.add_argument('--list', action='store_true',
+                        help='Print one line per file (format, vertices, properties, body offset)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    headers = scan_ply_headers(Path(args.root), args.pattern, args.threads, cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+
+    layouts = Counter()
+    n_points = 0
+    for rel, header in headers.items():
+        n, props = header.element('vertex')
+        layout = ' '.join(f'{ptype} {prop}' for prop, ptype in props)
+        layouts[(header.format, layout)] += 1
+        n_points += n
+        if args.list:
+            print(f"{rel}\t{header.format}\t{n}\t{layout}\t{header.body_offset}")
+
+    print(f"{len(headers)} PLY headers, {n_points} points in {elapsed:.2f}s")
+    for (fmt, layout), count in layouts.most_common():
+        print(f"  {count:>7} {fmt:<22} {layout}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+from tqdm import tqdm
+
+from goosekit.shards import SHARD_SUFFIX, ShardReader, read_shard_index, shard_groups, write_shard
+
+'''
+Pack a Goose dataset tree (original .bin scans, .label files, restored bins,
+PLYs, ...) into shard files and back.
+
+  pack    one <dir>/<sequence>.shard per directory and sequence (or per
+          --scans_per_shard files / --points_per_shard points), holding the files back to back with an
+          offset/length index and their relative paths
+  unpack  write the member files of every shard back to a directory tree
+  ls      list the shards (or, with --members, every member) under a root
+
+A shard root can be passed directly as --orig_bin_root / --orig_label_root of
+the restoration scripts and as --input_root of create_multi_format_dataset_parallel.py;
+every scan is then read as a memory-mapped slice of its shard.
+
+Those scripts can also write their outputs as shards: with --shard_outputs the
+files of each output root are packed into <dir>/<sequence>.shard as soon as the
+sequence is done, so only the sequences in flight exist as loose files.
+
+Usage:
+python shard_dataset.py pack \
+  --input_root /scratch/aniemcz/goose-pointcept/lidar \
+  --output_root /scratch/aniemcz/goose-pointcept/lidar_shards \
+  --pattern '*.bin'
+
+python shard_dataset.py unpack \
+  --input_root /scratch/aniemcz/goose-pointcept/lidar_shards \
+  --output_root /scratch/aniemcz/goose-pointcept/lidar
+'''
+
+
+def pack_shard(args):
+    shard_path, input_root, rels = args
+    return write_shard(shard_path, input_root, rels)
+
+
+def unpack_shard(args):
+    shard, output_root, overwrite = args
+    reader = ShardReader(shard)
+    written = 0
+    for rel in reader.index:
+        out = output_root / rel
+        if out.exists() and not overwrite:
+            continue
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, 'wb') as f:
+            f.write(reader.read_bytes(rel))
+        written += 1
+    return shard, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack a dataset tree into .shard files, unpack or list them')
+    parser.add_argument('command', choices=['pack', 'unpack', 'ls'])
+    parser.add_argument('--input_root', '-i', type=str, required=True,
+                        help='Tree to pack (pack) or root of .shard files (unpack / ls)')
+    parser.add_argument('--output_root', '-o', type=str, default=None,
+                        help='Where the shards (pack) or the unpacked tree (unpack) are written')
+    parser.add_argument('--pattern', type=str, default='*',
+                        help="Files to pack, matched on the file name (e.g. '*.bin', '*.label')")
+    parser.add_argument('--scans_per_shard', type=int, default=0,
+                        help='Split each sequence into shards of this many files (default 0: one shard per sequence)')
+    parser.add_argument('--points_per_shard', type=int, default=0,
+                        help='Split each sequence into shards of at most this many points (default 0: no limit; '
+                             'point counts are read from the input manifest.parquet if there is one)')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='unpack: rewrite files that already exist')
+    parser.add_argument('--members', action='store_true',
+                        help='ls: list every member file instead of the shards')
+    parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
+                        help='Parallel worker count')
+    args = parser.parse_args()
+
+    input_root = Path(args.input_root)
+    if args.command != 'ls' and args.output_root is None:
+        parser.error(f"{args.command} needs --output_root")
+
+    if args.command == 'ls':
+        for shard in sorted(input_root.rglob('*' + SHARD_SUFFIX)):
+            entries = read_shard_index(shard)
+            if args.members:
+                for rel, offset, length in entries:
+                    print(f"{shard.relative_to(input_root)}\t{rel}\t{offset}\t{length}")
+            else:
+                print(f"{shard.relative_to(input_root)}\t{len(entries)} files\t{shard.stat().st_size / 1e6:.1f} MB")
+        return
+
+    output_root = Path(args.output_root)
+    if args.command == 'pack':
+        groups = shard_groups(input_root, args.pattern, args.scans_per_shard, args.points_per_shard)
+        print(f"Packing {sum(len(rels) for _, rels in groups)} files into {len(groups)} shards")
+        tasks = [(output_root / shard_rel, input_root, rels) for shard_rel, rels in groups]
+        with Pool(processes=args.num_workers) as pool:
+            for _ in tqdm(pool.imap_unordered(pack_shard, tasks), total=len(tasks), desc="Packing"):
+                pass
+        print(f"Shards written under {output_root}")
+    else:
+        shards = sorted(input_root.rglob('*' + SHARD_SUFFIX))
+        tasks = [(s, output_root, args.overwrite) for s in shards]
+        n_files = 0
+        with Pool(processes=args.num_workers) as pool:
+            for shard, written in tqdm(pool.imap_unordered(unpack_shard, tasks), total=len(tasks), desc="Unpacking"):
+                n_files += written
+        print(f"Unpacked {n_files} files from {len(shards)} shards into {output_root}")
+
+
+if __name__ == '__main__':
+    main()
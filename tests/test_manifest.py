@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from goosekit.manifest import list_files, manifest_is_current, manifest_path, walk_files
+
+
+def _touch(path: Path, data: bytes = b'\0' * 16):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_walk_files_skips_hidden_directories(tmp_path):
+    _touch(tmp_path / 'val' / 'a.ply')
+    _touch(tmp_path / 'val' / 'b.bin')
+    # left behind by an interrupted writer
+    _touch(tmp_path / 'val' / '.reno-out-x1' / '000001_a.ply')
+    _touch(tmp_path / '.tmp-123' / 'c.ply')
+
+    assert [rel for rel, _, _ in walk_files(tmp_path, '*.ply')] == [Path('val/a.ply')]
+    assert list_files(tmp_path, '*') == [Path('val/a.ply'), Path('val/b.bin')]
+
+
+def test_manifest_is_current_ignores_hidden_directories(tmp_path):
+    _touch(tmp_path / 'val' / 'a.bin')
+    _touch(manifest_path(tmp_path))
+    built = manifest_path(tmp_path).stat().st_mtime_ns
+    for d in (tmp_path, tmp_path / 'val'):
+        os.utime(d, ns=(built - 10**9, built - 10**9))
+
+    _touch(tmp_path / 'val' / '.reno-out-x1' / '000001_a.ply')
+    os.utime(tmp_path / 'val', ns=(built - 10**9, built - 10**9))
+    assert manifest_is_current(tmp_path)
+
+    _touch(tmp_path / 'val' / 'b.bin')
+    assert not manifest_is_current(tmp_path)
@@ -0,0 +1,34 @@
+from pathlib import Path
+import numpy as np
+
+from goosekit.shards import ShardPacker, open_store
+
+
+def _write(path: Path, value: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.full(4, value, dtype=np.float32).tofile(path)
+
+
+def test_shard_packer_packs_each_sequence_once_it_is_done(tmp_path):
+    rels = [Path(f'val/2023-04-20_campus__{k:04d}_1681996776758{k}_vls128.bin') for k in range(3)]
+    out = tmp_path / 'out'
+    packer = ShardPacker([out])
+    for rel in rels:
+        # two outputs per scan in the same group, like the x / y / z files of LCP
+        assert packer.add(rel, [out / rel, out / rel.with_suffix('.label')]) == [out / rel, out / rel.with_suffix('.label')]
+
+    for k, rel in enumerate(rels):
+        _write(out / rel, k)
+        _write(out / rel.with_suffix('.label'), k)
+        packer.finished(rel)
+        if k < 2:
+            assert not list(out.rglob('*.shard'))
+    packer.close()
+
+    assert [p.relative_to(out) for p in out.rglob('*.*')] == [Path('val/2023-04-20_campus.shard')]
+    store = open_store(out)
+    assert len(store.files()) == 6
+    assert np.array_equal(store.array(rels[2], '<f4'), np.full(4, 2, dtype=np.float32))
+
+    # a later run leaves the packed outputs out
+    assert ShardPacker([out]).add(rels[0], [out / rels[0]]) == []
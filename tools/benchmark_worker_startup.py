@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+'''
+Startup cost of a pool worker: wall time and peak RSS of a fresh interpreter
+importing what a restoration worker imports.
+
+  baseline          bare interpreter
+  numpy             + numpy
+  numpy+scipy       + scipy.spatial (the kdtree backend)
+  open3d            + open3d, what every worker imported before the Open3D-free path
+  <script>          the restoration scripts as they are now (module import only)
+
+Every target is run --repeats times in its own process (median time, max RSS).
+With --pool N a 'spawn' Pool of N workers that each import the target is started
+and timed until all of them answered, which is what a 64 worker run pays on
+platforms / configurations that spawn instead of fork.
+
+Usage:
+python tools/benchmark_worker_startup.py --repeats 5
+python tools/benchmark_worker_startup.py --pool 16 --targets open3d restore_intensity_feature_dataset_parallel2
+'''
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+TARGETS = {
+    'baseline': [],
+    'numpy': ['numpy'],
+    'numpy+scipy': ['numpy', 'scipy.spatial'],
+    'open3d': ['numpy', 'open3d'],
+}
+SCRIPTS = [
+    'restore_intensity_feature_dataset_parallel2',
+    'restore_quantized_intensity_feature_dataset_parallel2',
+    'transfer_attributes_4_decompressed_lidar',
+    'create_labels_4_decompressed_lidar',
+    'backproject_predictions_4_original_lidar',
+]
+
+_PROBE = '''
+import sys, json, time, resource, importlib
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+print(json.dumps({{'secs': time.perf_counter() - start,
+                   'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+'''
+
+
+def modules_of(target: str):
+    return TARGETS.get(target, [target])
+
+
+def probe(modules):
+    """(import seconds, peak RSS MB) of one fresh interpreter importing `modules`."""
+    code = _PROBE.format(root=str(REPO_ROOT), modules=modules)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=REPO_ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    res = json.loads(proc.stdout.strip().splitlines()[-1])
+    return res['secs'], res['rss_mb']
+
+
+def _import_all(modules):
+    sys.path.insert(0, str(REPO_ROOT))
+    for name in modules:
+        __import__(name)
+
+
+def _ready(_):
+    return os.getpid()
+
+
+def pool_startup(modules, n_workers: int) -> float:
+    """Seconds until a spawn Pool of n_workers, each importing `modules`, has answered once per worker."""
+    ctx = multiprocessing.get_context('spawn')
+    start = time.perf_counter()
+    with ctx.Pool(processes=n_workers, initializer=_import_all, initargs=(modules,)) as pool:
+        pool.map(_ready, range(n_workers), chunksize=1)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the per-worker import cost of the restoration scripts')
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS) + SCRIPTS,
+                        help='Import targets: baseline / numpy / numpy+scipy / open3d or a module name')
+    parser.add_argument('--repeats', '-r', type=int, default=5, help='Fresh interpreters per target')
+    parser.add_argument('--pool', type=int, default=0,
+                        help='Also time a spawn Pool of this many workers importing each target')
+    args = parser.parse_args()
+
+    print(f"{'target':<56} {'import s':>9} {'peak RSS MB':>12}" + (f" {'pool s':>8}" if args.pool else ''))
+    for target in args.targets:
+        modules = modules_of(target)
+        try:
+            runs = [probe(modules) for _ in range(args.repeats)]
+        except RuntimeError as e:
+            print(f"{target:<56} unavailable: {e}")
+            continue
+        secs = statistics.median(r[0] for r in runs)
+        rss = max(r[1] for r in runs)
+        line = f"{target:<56} {secs:>9.3f} {rss:>12.1f}"
+        if args.pool:
+            line += f" {pool_startup(modules, args.pool):>8.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import os
+import argparse
+from pathlib import Path
+import numpy as np
+
+from goosekit.cli import add_nn_args, index_cache_from_args
+from goosekit.index_cache import shared_cache
+from goosekit.labels import label_rel_path, read_label
+from goosekit.neighbors import ScanMatcher
+from goosekit.ply import read_ply
+from goosekit.report import finish_reports, threshold_check
+from goosekit.shards import ShardPacker, open_store
+from goosekit.shm_cache import attach_store
+from goosekit.tasks import group_by_scan, per_root, run_scan_tasks, scan_originals, voxel_sizes_for_roots
+
+'''
+Single-pass attribute transfer for decompressed lidar (intensity + labels):
+- Reads decompressed PLYs (xyz only)
+- Reads the original BIN (xyz+intensity) and original LABEL once per scan
+- Builds one neighbour index over the original xyz and does one batched query
+- Writes the merged xyz+intensity BIN and the packed (inst<<16 | sem) LABEL
+  from the same match, preserving directory structure
+- Per-file distance statistics go to a sidecar report; --threshold_policy
+  handles points beyond --threshold (fail / warn / drop_points from both outputs)
+
+This replaces running restore_intensity_feature_dataset_parallel2.py followed by
+create_labels_4_decompressed_lidar.py, which each read the original scan and
+built their own KD-tree.
+
+Usage:
+Q_lvl="Q_128"
+python transfer_attributes_4_decompressed_lidar.py \
+  --ply_root /scratch/aniemcz/goose-pointcept/reno_decompressed_lidar/${Q_lvl} \
+  --orig_bin_root /scratch/aniemcz/goose-pointcept/lidar \
+  --orig_label_root /scratch/aniemcz/goose-pointcept/labels_challenge \
+  --out_bin_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_lidar/${Q_lvl} \
+  --out_label_root /scratch/aniemcz/goose-pointcept/reno_bin_decompressed_labels_challenge/${Q_lvl} \
+  --no_threshold \
+  --num_workers 4
+
+Several Q levels at once (each original scan is read and indexed once for all):
+python transfer_attributes_4_decompressed_lidar.py \
+  --ply_root goose-dataset/reno_decompressed_lidar/Q_8 goose-dataset/reno_decompressed_lidar/Q_64 goose-dataset/reno_decompressed_lidar/Q_512 \
+  --orig_bin_root goose-dataset/lidar \
+  --orig_label_root goose-dataset/labels_challenge \
+  --out_bin_root goose-dataset/reno_bin_decompressed_lidar/Q_8 goose-dataset/reno_bin_decompressed_lidar/Q_64 goose-dataset/reno_bin_decompressed_lidar/Q_512 \
+  --out_label_root goose-dataset/reno_bin_decompressed_labels_challenge/Q_8 goose-dataset/reno_bin_decompressed_labels_challenge/Q_64 goose-dataset/reno_bin_decompressed_labels_challenge/Q_512 \
+  --threshold 0.007 0.059 0.45
+'''
+
+def transfer_attributes_nn(args):
+    """
+    Worker: restore intensity + labels for every decompressed version (Q level)
+    of one original scan, reading and indexing the original once.
+    """
+    rel, levels, orig_bin_root, orig_label_root, no_threshold, nn_backend, query_threads, match_mode, index_cache, threshold_policy, shared = args
+    todo = [lvl for lvl in levels if not (lvl[1].exists() and lvl[2].exists())]
+    if not todo:
+        return [f"{lvl[1]} | {lvl[2]}" for lvl in levels], []
+
+    # Load the original scan (once; from the parent's shared memory with --shm_cache_gb)
+    shared_store = attach_store(shared) if shared else None
+    orig_bins = shared_store or open_store(orig_bin_root)
+    xyz_orig, intensity_orig = orig_bins.read_bin_xyz_intensity(rel)
+    sem_orig, inst_orig = read_label(shared_store or open_store(orig_label_root), label_rel_path(rel))
+    if xyz_orig.shape[0] != sem_orig.shape[0]:
+        raise ValueError(f"Original point count mismatch: bin {xyz_orig.shape[0]} vs label {sem_orig.shape[0]}")
+
+    # One index for both attributes and every Q level
+    cache = shared_cache(*index_cache) if index_cache else None
+    matcher = ScanMatcher(xyz_orig, backend=nn_backend, workers=query_threads,
+                          cache=cache, scan_key=orig_bins.digest(rel) if cache else None)
+
+    rows = []
+    for ply_path, out_bin, out_label, threshold, voxel_size in todo:
+        out_bin.parent.mkdir(parents=True, exist_ok=True)
+        out_label.parent.mkdir(parents=True, exist_ok=True)
+
+        xyz_dec = read_ply(ply_path)
+        dists, idxs = matcher.match(xyz_dec, match_mode=match_mode, voxel_size=voxel_size)
+
+        row, keep = threshold_check(ply_path, out_bin, dists, None if no_threshold else threshold, threshold_policy)
+        rows.append(row)
+        if row['status'] == 'failed':
+            continue
+        if keep is not None:
+            xyz_dec, idxs = xyz_dec[keep], idxs[keep]
+
+        # Merge xyz + intensity and write
+        merged = np.hstack((xyz_dec, intensity_orig[idxs].reshape(-1, 1))).astype(np.float32)
+        merged.tofile(str(out_bin))
+
+        # Pack back into uint32 (inst<<16 | sem) and write
+        out_data = (inst_orig[idxs] << 16) | sem_orig[idxs]
+        out_data.astype(np.uint32).tofile(str(out_label))
+    return [f"{lvl[1]} | {lvl[2]}" for lvl in levels if lvl[1].exists() and lvl[2].exists()], rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Restore intensity and semantic/instance labels in one NN pass (parallel)'
+    )
+    parser.add_argument('--ply_root', '-p', type=str, nargs='+', required=True,
+                        help='Root directory of decompressed PLYs (several roots, e.g. one per Q level, '
+                             'share one read + index build of each original scan)')
+    parser.add_argument('--orig_bin_root', '-b', type=str, required=True,
+                        help='Root of original BINs (xyz+i; a directory tree or packed .shard files)')
+    parser.add_argument('--orig_label_root', '-l', type=str, required=True,
+                        help='Root of original LABELs (a directory tree or packed .shard files)')
+    parser.add_argument('--out_bin_root', '-o', type=str, nargs='+', required=True,
+                        help='Output root for merged BINs (one per --ply_root)')
+    parser.add_argument('--out_label_root', '-O', type=str, nargs='+', required=True,
+                        help='Output root for restored LABELs (one per --ply_root)')
+    parser.add_argument('--threshold', '-t', type=float, nargs='+', default=[0.01],
+                        help='Max distance (m) to match nearest point (one value, or one per --ply_root)')
+    parser.add_argument('--no_threshold', '-s', action='store_true',
+                        help='If specified then turns off threshold sanity check')
+    parser.add_argument('--num_workers', '-n', type=int, default=os.cpu_count(),
+                        help='Parallel worker count')
+    add_nn_args(parser, shm_cache='original scans and labels', drop_points='leaves the far points out of both outputs')
+    args = parser.parse_args()
+
+    n_roots = len(args.ply_root)
+    if len(args.out_bin_root) != n_roots or len(args.out_label_root) != n_roots:
+        parser.error("--out_bin_root and --out_label_root need one root per --ply_root")
+    ply_roots = [Path(p) for p in args.ply_root]
+    orig_bin_root = Path(args.orig_bin_root)
+    orig_label_root = Path(args.orig_label_root)
+    out_bin_roots = [Path(p) for p in args.out_bin_root]
+    out_label_roots = [Path(p) for p in args.out_label_root]
+    thresholds = per_root(args.threshold, n_roots, 'threshold')
+    index_cache = index_cache_from_args(args)
+    voxel_sizes = voxel_sizes_for_roots(args.voxel_size, ply_roots)
+
+    groups = group_by_scan(ply_roots, '*.ply')
+    n_files = sum(len(g) for g in groups.values())
+    print(f"Found {n_files} PLY files for {len(groups)} original scans under {n_roots} root(s)")
+    packer = ShardPacker(out_bin_roots + out_label_roots) if args.shard_outputs else None
+    tasks, originals = [], []
+    for rel, members in groups.items():
+        levels = [(p, out_bin_roots[i] / rel, out_label_roots[i] / label_rel_path(rel), thresholds[i], voxel_sizes[i])
+                  for i, p in members]
+        if packer:
+            # levels packed by an earlier run are done
+            levels = packer.add(rel, levels, lambda lvl: lvl[1:3])
+            if not levels:
+                continue
+        tasks.append((rel, levels, orig_bin_root, orig_label_root, args.no_threshold,
+                      args.nn_backend, args.query_threads, args.match_mode, index_cache, args.threshold_policy))
+        originals.append(scan_originals(rel, [out for lvl in levels for out in lvl[1:3]], orig_bin_root, orig_label_root))
+
+    rows = run_scan_tasks(transfer_attributes_nn, tasks, originals, args.num_workers,
+                          "Transferring intensity+labels NN", "Restored", args.shm_cache_gb, index_cache, packer)
+    finish_reports(rows, args.report, out_bin_roots)
+
+    print("Attribute transfer (NN) complete.")
+
+if __name__ == '__main__':
+    main()